@@ -0,0 +1,143 @@
+# asset_manager.py
+import threading
+import time
+import arcade
+
+# Every image, sound and font the game loads, by the group that first needs it. The welcome
+# group is loaded before the first frame and the game group on a worker thread while the
+# welcome screen scrolls. Music isn't listed, sound_track streams it as it plays.
+MANIFEST = {
+    "welcome": [
+        "assets/images/galaxy_background.png",
+        "assets/sounds/background_noise.wav",
+        ":resources:fonts/ttf/Kenney Blocks.ttf",
+        ":resources:fonts/ttf/Kenney Mini Square.ttf",
+    ],
+    "game": [
+        "assets/images/SunSprite.png",
+        "assets/images/light_grey_rock.png",
+        "assets/images/brown_rock.png",
+        "assets/images/melting_rock.png",
+        "assets/images/magma.png",
+        "assets/images/white_particle.png",
+        "assets/images/blue_energy.png",
+        "assets/images/red_energy.png",
+        "assets/images/purple_energy.png",
+        "assets/images/green_triangle.png",
+        "assets/sounds/attraction_sound.wav",
+        "assets/sounds/repulsion_sound.wav",
+        "assets/sounds/explosion_sound.wav",
+        "assets/sounds/alignment_sound.wav",
+        "assets/sounds/radioactive_emission_sound.wav",
+        "assets/sounds/positive_emission_sound.wav",
+        "assets/sounds/negative_emission_sound.wav",
+        "assets/sounds/neutral_emission_sound.wav",
+    ],
+}
+
+
+def load_asset(file_name):
+    if file_name.endswith(".png"):
+        # arcade would otherwise trace the hit box from the pixels the first time a sprite uses
+        # the texture, over a third of a second for the sun. Nothing reads sprite hit boxes,
+        # since World does its own collisions, so the box the size of the image is left as is.
+        return arcade.load_texture(file_name, hit_box_algorithm="None")
+    if file_name.endswith(".wav"):
+        return arcade.load_sound(file_name)
+    if file_name.endswith(".ttf"):
+        arcade.load_font(file_name)
+        return file_name
+    raise ValueError(f"unknown asset type {file_name}")
+
+
+# Loads assets by file name and keeps them. Images and sounds are only read and decoded, so
+# that can happen on the worker thread. Putting the textures in the GPU texture atlas needs
+# the window's GL context, so upload_next_texture does that one texture per welcome frame.
+# Asking for an asset the worker hasn't got to yet just loads it there and then.
+class AssetManager:
+    def __init__(self, manifest=MANIFEST):
+        self.manifest = manifest
+        self.assets = {}
+        # Seconds each asset took to load, and which thread loaded it
+        self.load_times = {}
+        self.loaded_by = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+        self.worker = None
+        self.uploaded = set()
+        self.start_time = time.perf_counter()
+        self.marks = {}
+
+    def get(self, file_name):
+        asset = self.assets.get(file_name)
+        if asset is None:
+            asset = self.load(file_name, "main")
+        return asset
+
+    def load(self, file_name, thread_name):
+        with self.lock:
+            if file_name in self.assets:
+                return self.assets[file_name]
+            start = time.perf_counter()
+            try:
+                asset = load_asset(file_name)
+            except Exception as error:
+                self.errors[file_name] = error
+                raise
+            self.load_times[file_name] = time.perf_counter() - start
+            self.loaded_by[file_name] = thread_name
+            self.assets[file_name] = asset
+            return asset
+
+    def load_group(self, group):
+        for file_name in self.manifest[group]:
+            self.get(file_name)
+
+    def preload(self, groups):
+        # Loads the groups on a daemon thread, a missing file is kept in errors and raised
+        # again when the game asks for it
+        def run():
+            for group in groups:
+                for file_name in self.manifest[group]:
+                    try:
+                        self.load(file_name, "worker")
+                    except Exception:
+                        pass
+            self.mark("preloaded")
+
+        self.worker = threading.Thread(target=run, name="asset-preload", daemon=True)
+        self.worker.start()
+
+    def upload_next_texture(self, atlas):
+        for file_name, asset in list(self.assets.items()):
+            if file_name not in self.uploaded and isinstance(asset, arcade.Texture):
+                self.uploaded.add(file_name)
+                start = time.perf_counter()
+                atlas.add(asset)
+                self.load_times[file_name] += time.perf_counter() - start
+                return True
+        return False
+
+    def is_preloaded(self):
+        return self.worker is not None and not self.worker.is_alive()
+
+    def mark(self, name):
+        # Records how long after startup something happened, like the first frame
+        self.marks.setdefault(name, time.perf_counter() - self.start_time)
+
+    def timing_report(self):
+        groups = {}
+        for group, file_names in self.manifest.items():
+            times = [self.load_times[file_name] for file_name in file_names if file_name in self.load_times]
+            groups[group] = {"loaded": len(times), "of": len(file_names), "seconds": round(sum(times), 4)}
+        return {
+            "marks": {name: round(seconds, 4) for name, seconds in self.marks.items()},
+            "groups": groups,
+            "assets": {file_name: {"ms": round(seconds * 1000, 2), "thread": self.loaded_by[file_name]}
+                       for file_name, seconds in sorted(self.load_times.items(), key=lambda item: -item[1])},
+            "errors": {file_name: str(error) for file_name, error in self.errors.items()},
+        }
+
+
+# The one asset manager the game shares
+assets = AssetManager()
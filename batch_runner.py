@@ -0,0 +1,227 @@
+# batch_runner.py plays many seeded headless games across all CPU cores and prints statistics as JSON
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("ARCADE_HEADLESS", "1")
+
+from constants import (SCREEN_WIDTH, SCREEN_HEIGHT, ORBIT_SPEED, PARTICLE_EMISSION_MIN_TIME,
+                       PARTICLE_EMISSION_MAX_TIME)
+from particles import PositiveParticle, NegativeParticle
+from world import World, STEERING_KEYS
+from arcade import key
+from bot import SearchBot
+from replay import PRESS
+
+MAX_TICKS = 60 * 60 * 10  # Ten minutes of game time
+
+
+class IdlePolicy:
+    # Never touches the keys, so the planet only grows from what falls onto it
+    def __init__(self, rng):
+        self.rng = rng
+
+    def step(self, world):
+        pass
+
+
+class RandomPolicy:
+    # Holds a random steering key, or none, for a random half second to a second and a half
+    def __init__(self, rng):
+        self.rng = rng
+        self.held_key = None
+        self.next_change = 0
+
+    def step(self, world):
+        if world.tick < self.next_change:
+            return
+        if self.held_key is not None:
+            world.release_key(self.held_key)
+        self.held_key = self.rng.choice(STEERING_KEYS + [None] * 4)
+        if self.held_key is not None:
+            world.press_key(self.held_key)
+        self.next_change = world.tick + self.rng.randint(30, 90)
+
+
+class SweepPolicy:
+    # Taps W, D, S and A in turn, one a second
+    KEYS = [key.W, key.D, key.S, key.A]
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def step(self, world):
+        if world.tick % 60 == 0:
+            world.press_key(self.KEYS[world.tick // 60 % len(self.KEYS)])
+
+
+class AimPolicy:
+    # Every quarter second steers the charged particle nearest the planet at its middle.
+    # W sends positive particles down and negative ones up, and so on for the other keys.
+    def __init__(self, rng):
+        self.rng = rng
+
+    def step(self, world):
+        if world.tick % 15 != 0:
+            return
+        charged = world.steerable_particles[PositiveParticle] | world.steerable_particles[NegativeParticle]
+        if not charged:
+            return
+        particle = min(charged, key=lambda particle: abs(SCREEN_WIDTH / 2 - particle.center_x)
+                       + abs(SCREEN_HEIGHT / 2 - particle.center_y))
+        dx = SCREEN_WIDTH / 2 - particle.center_x
+        dy = SCREEN_HEIGHT / 2 - particle.center_y
+        if abs(dx) > abs(dy):
+            pressed_key = key.A if dx > 0 else key.D
+        else:
+            pressed_key = key.S if dy > 0 else key.W
+        if isinstance(particle, NegativeParticle):
+            pressed_key = {key.A: key.D, key.D: key.A, key.W: key.S, key.S: key.W}[pressed_key]
+        world.press_key(pressed_key)
+
+
+class SearchPolicy:
+    # The search bot, given as long as it needs for each decision. Far slower than the others.
+    def __init__(self, rng):
+        self.rng = rng
+        self.bot = SearchBot(time_budget=None)
+
+    def step(self, world):
+        def send_key(action, pressed_key):
+            if action == PRESS:
+                world.press_key(pressed_key)
+            else:
+                world.release_key(pressed_key)
+
+        self.bot.step(world, send_key)
+
+
+POLICIES = {
+    "idle": IdlePolicy,
+    "random": RandomPolicy,
+    "sweep": SweepPolicy,
+    "aim": AimPolicy,
+    "search": SearchPolicy,
+}
+
+
+def play_game(job):
+    seed, policy_name, max_ticks, settings = job
+    world = World(seed, **settings)
+    world.setup()
+    # The policy has its own RNG so it never changes what the world's RNG produces
+    policy = POLICIES[policy_name](random.Random(seed * 7919 + 1))
+    start = time.perf_counter()
+    while not world.is_game_over and world.tick < max_ticks:
+        policy.step(world)
+        world.step()
+        world.pop_sound_events()
+    seconds = time.perf_counter() - start
+    return {
+        "seed": seed,
+        "score": world.score,
+        "ticks": world.tick,
+        "hit_sun": world.is_game_over,
+        "collapses": world.collapses,
+        "particles": len(world.particles),
+        "seconds": round(seconds, 4),
+    }
+
+
+def summarize(values):
+    values = sorted(values)
+    count = len(values)
+
+    def percentile(fraction):
+        return values[min(count - 1, int(fraction * count))]
+
+    return {
+        "mean": round(sum(values) / count, 3),
+        "min": values[0],
+        "p10": percentile(0.1),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "max": values[-1],
+    }
+
+
+def aggregate(results, wall_seconds):
+    total_ticks = sum(result["ticks"] for result in results)
+    score_buckets = Counter(result["score"] // 10 * 10 for result in results)
+    return {
+        "games": len(results),
+        "score": summarize([result["score"] for result in results]),
+        "score_histogram": {f"{bucket}-{bucket + 9}": score_buckets[bucket] for bucket in sorted(score_buckets)},
+        "ticks": summarize([result["ticks"] for result in results]),
+        "hit_sun": sum(result["hit_sun"] for result in results),
+        "collapses": summarize([result["collapses"] for result in results]),
+        "collapses_total": sum(result["collapses"] for result in results),
+        "ticks_per_second_per_game": summarize([round(result["ticks"] / result["seconds"])
+                                                for result in results if result["seconds"]]),
+        "ticks_per_second": round(total_ticks / wall_seconds) if wall_seconds else None,
+        "wall_seconds": round(wall_seconds, 2),
+    }
+
+
+def run_batch(executor, seeds, policy_name, max_ticks, settings, workers):
+    jobs = [(seed, policy_name, max_ticks, settings) for seed in seeds]
+    # Enough chunks per worker that a few long games don't leave the other cores idle
+    chunksize = max(1, math.ceil(len(jobs) / (workers * 8)))
+    start = time.perf_counter()
+    results = list(executor.map(play_game, jobs, chunksize=chunksize))
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many seeded Teraform games headless and summarize them")
+    parser.add_argument("--games", type=int, default=1000, help="games per setting")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS, help="a game that lasts this long is stopped")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    # Give several values to any of these to sweep every combination
+    parser.add_argument("--emission-min", type=float, nargs="+", default=[PARTICLE_EMISSION_MIN_TIME])
+    parser.add_argument("--emission-max", type=float, nargs="+", default=[PARTICLE_EMISSION_MAX_TIME])
+    parser.add_argument("--orbit-speed", type=float, nargs="+", default=[ORBIT_SPEED])
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--games-csv", help="write one row per game to this CSV file")
+    args = parser.parse_args()
+
+    seeds = range(args.first_seed, args.first_seed + args.games)
+    results = {"policy": args.policy, "max_ticks": args.max_ticks, "workers": args.workers, "settings": []}
+    game_rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for emission_min, emission_max, orbit_speed in itertools.product(args.emission_min, args.emission_max,
+                                                                          args.orbit_speed):
+            settings = {"emission_min_time": emission_min, "emission_max_time": emission_max,
+                        "orbit_speed": orbit_speed}
+            games, wall_seconds = run_batch(executor, seeds, args.policy, args.max_ticks, settings, args.workers)
+            summary = aggregate(games, wall_seconds)
+            results["settings"].append(dict(settings, **summary))
+            game_rows.extend(dict(settings, **game) for game in games)
+            print(f"{settings}: mean score {summary['score']['mean']}, {summary['ticks_per_second']} ticks/s",
+                  file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    if args.games_csv:
+        columns = list(game_rows[0])
+        with open(args.games_csv, "w") as file:
+            file.write(",".join(columns) + "\n")
+            for row in game_rows:
+                file.write(",".join(str(row[column]) for column in columns) + "\n")
+
+
+if __name__ == "__main__":
+    main()
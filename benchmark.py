@@ -0,0 +1,287 @@
+# benchmark.py times the hot paths of a tick on synthetic planets and prints the results as JSON
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# Rendering is measured in an offscreen window, so no display is needed
+os.environ.setdefault("ARCADE_HEADLESS", "1")
+
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from particles import (LightGreyParticle, BrownParticle, MeltingParticle, MagmaParticle, WhiteParticle,
+                       PositiveParticle, NegativeParticle, FireParticle, RadioactiveParticle)
+from particles import MOVING, STATIONARY
+from world import World
+from collision_handling import detect_collision, check_adjacent_particles
+from square_building import find_3x3_squares, square_windows, check_for_square
+from save_game import save_world, load_world
+
+# The screen holds about 3,700 cells, so the 10000 planet runs past its edges. Those particles
+# stay part of the planet like any other, they are just never drawn.
+SIZES = [100, 1000, 10000]
+# Pixels between the visible planet and the top and bottom of the screen kept free for the
+# incoming particles, which are culled as soon as they are off the screen
+INCOMING_ROOM = 100
+PHASES = ["detect_collision", "check_adjacent_particles", "find_3x3_squares", "sun_contact", "step", "draw"]
+
+# Rough mix of stationary particle types in a late game planet
+STATIONARY_TYPES = [LightGreyParticle] * 8 + [BrownParticle] * 4 + [MeltingParticle] * 2 + \
+                   [MagmaParticle, WhiteParticle] + [PositiveParticle, NegativeParticle] * 2
+MOVING_TYPES = [LightGreyParticle, PositiveParticle, NegativeParticle, RadioactiveParticle]
+
+
+def build_world(stationary_count, moving_count=60, seed=0):
+    # A roughly round planet grown outwards from the center cell, with particles falling in
+    # from between it and the edges of the screen
+    rng = random.Random(seed)
+    world = World(seed=seed)
+    center_x = SCREEN_WIDTH / 2
+    center_y = SCREEN_HEIGHT / 2
+
+    # On the screen the planet stops INCOMING_ROOM short of the top and bottom edges, and a
+    # planet too big for that carries on past the edges of the screen instead
+    visible_reach = min(SCREEN_WIDTH, SCREEN_HEIGHT) / 2 - INCOMING_ROOM
+    # Big enough for the planet even with every cell on the screen left out
+    lattice_radius = int(math.sqrt((stationary_count + SCREEN_WIDTH * SCREEN_HEIGHT / 400) / math.pi)) + 4
+    cells = [(i, j) for i in range(-lattice_radius, lattice_radius + 1)
+             for j in range(-lattice_radius, lattice_radius + 1)
+             if 20 * math.hypot(i, j) + 10 <= visible_reach or not on_screen(center_x + 20 * i, center_y + 20 * j)]
+    # A little noise on the distance gives the planet a ragged edge
+    cells.sort(key=lambda cell: math.hypot(*cell) + rng.uniform(0, 1.5))
+    cells = cells[:stationary_count]
+
+    charged_cells = set()
+    for i, j in cells:
+        particle_type = rng.choice(STATIONARY_TYPES)
+        if particle_type in (PositiveParticle, NegativeParticle):
+            # Charged particles never sit next to each other on a real planet, they react first
+            if any((i + di, j + dj) in charged_cells for di, dj in ((1, 0), (-1, 0), (0, 1), (0, -1))):
+                particle_type = LightGreyParticle
+            else:
+                charged_cells.add((i, j))
+        particle = add_stationary(world, particle_type, center_x + 20 * i, center_y + 20 * j)
+        cell = world.stationary_grid.particle_cells[particle]
+        if any(check_for_square(world, particle_type, window) for window in square_windows(cell)):
+            # A full square would have collapsed already, so use a type that can't complete it
+            world.particles.remove(particle)
+            world.discard_stationary_particle(particle)
+            replacement_type = WhiteParticle if particle_type is not WhiteParticle else BrownParticle
+            add_stationary(world, replacement_type, particle.center_x, particle.center_y)
+    world.square_check_cells.clear()
+
+    planet_radius = min(20 * max(math.hypot(*cell) for cell in cells) + 10, visible_reach)
+    for n in range(moving_count):
+        particle = rng.choice(MOVING_TYPES)()
+        direction = rng.uniform(0, 2 * math.pi)
+        # Anywhere between the planet and the edge of the screen, so they keep landing for a while
+        screen_reach = min(center_x / max(abs(math.cos(direction)), 1e-9),
+                           center_y / max(abs(math.sin(direction)), 1e-9)) - 20
+        distance = rng.uniform(planet_radius + 20, screen_reach)
+        particle.center_x = center_x + distance * math.cos(direction)
+        particle.center_y = center_y + distance * math.sin(direction)
+        particle.angle = particle.angle_towards_center(center_x, center_y)
+        world.particles.append(particle)
+        world.add_moving_particle(particle)
+    for n in range(moving_count // 10):
+        world.particles.append(FireParticle(center_x + rng.uniform(-300, 300), center_y + rng.uniform(-200, 200)))
+
+    # Park the sun's orbit clear of the particles that snap onto the planet while it is stepped
+    park_sun(world, 40)
+    check_world(world)
+    return world
+
+
+def park_sun(world, gap):
+    # Puts the sun's orbit gap pixels outside the planet's farthest corner
+    reach = max(math.hypot(abs(particle.center_x - SCREEN_WIDTH / 2) + particle.width / 2,
+                           abs(particle.center_y - SCREEN_HEIGHT / 2) + particle.height / 2)
+                for particle in world.stationary_particles)
+    world.sun.orbit_radius = reach + world.sun.radius + gap
+    world.sun.update(0)
+
+
+def on_screen(x, y):
+    return 0 <= x <= SCREEN_WIDTH and 0 <= y <= SCREEN_HEIGHT
+
+
+def check_world(world):
+    # Every stationary and moving particle has to be in the store with the matching state, and
+    # some particles have to still be falling in, or the timings are of some other world than
+    # the one asked for
+    store = world.particles
+    stationary_rows = int((store.state[:store.count] == STATIONARY).sum())
+    counts = [len(world.stationary_particles), len(world.stationary_grid),
+              sum(len(particles) for particles in world.planet_rings.values())]
+    if counts != [stationary_rows] * 3:
+        raise RuntimeError(f"stationary particles out of step: {stationary_rows} rows, set/grid/rings {counts}")
+    if any(particle not in store or particle.state != MOVING for particle in world.moving_particles):
+        raise RuntimeError("a moving particle is missing from the store")
+    if not any(on_screen(particle.center_x, particle.center_y) for particle in world.moving_particles):
+        raise RuntimeError("no moving particles are left on the screen")
+    if world.planet_touches_sun():
+        raise RuntimeError("the planet touches the sun")
+
+
+def fixture_world(stationary_count, fixture_dir):
+    # Loads the planet from a save_game file, building and saving it the first time
+    file_name = os.path.join(fixture_dir, f"planet_{stationary_count}.sav")
+    if not os.path.exists(file_name):
+        os.makedirs(fixture_dir, exist_ok=True)
+        save_world(build_world(stationary_count), file_name)
+    world = load_world(file_name)
+    check_world(world)
+    return world
+
+
+def add_stationary(world, particle_type, x, y):
+    particle = particle_type()
+    particle.center_x = x
+    particle.center_y = y
+    particle.speed = 0
+    world.particles.append(particle)
+    world.add_stationary_particle(particle)
+    return particle
+
+
+def time_calls(function, iterations):
+    times = []
+    for n in range(iterations):
+        start = time.perf_counter()
+        function(n)
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+def summarize(times):
+    times = sorted(times)
+    count = len(times)
+    return {
+        "iterations": count,
+        "mean_ms": round(sum(times) / count * 1000, 4),
+        "p50_ms": round(times[count // 2] * 1000, 4),
+        "p95_ms": round(times[min(count - 1, int(count * 0.95))] * 1000, 4),
+        "min_ms": round(times[0] * 1000, 4),
+        "max_ms": round(times[-1] * 1000, 4),
+    }
+
+
+def benchmark_phase(phase, stationary_count, iterations, window, fixture_dir=None):
+    # Every phase gets a fresh copy of the same world, so one phase can't change another's input
+    world = build_world(stationary_count) if fixture_dir is None else fixture_world(stationary_count, fixture_dir)
+    stationary = sorted(world.stationary_particles, key=lambda particle: (particle.center_x, particle.center_y))
+    rng = random.Random(1)
+
+    if phase == "detect_collision":
+        def detect(n):
+            detect_collision(world)
+            world.apply_spawns()
+        stats = time_calls(detect, iterations)
+        check_world(world)
+        return stats
+    if phase == "check_adjacent_particles":
+        def check_adjacent(n):
+            check_adjacent_particles(world, rng.choice(stationary))
+            world.apply_spawns()
+        return time_calls(check_adjacent, iterations)
+    if phase == "find_3x3_squares":
+        def add_and_find(n):
+            # As if one particle had just snapped into place
+            particle = rng.choice(stationary)
+            world.square_check_cells.append((type(particle), world.stationary_grid.particle_cells[particle]))
+            find_3x3_squares(world)
+            world.apply_spawns()
+        return time_calls(add_and_find, iterations)
+    if phase == "sun_contact":
+        # Close enough that the check can't rule the planet out with one comparison and has to
+        # test the particles in its outer ring
+        park_sun(world, 1)
+        return time_calls(lambda n: world.planet_touches_sun(), iterations)
+    if phase == "step":
+        stats = time_calls(lambda n: world.step(), iterations)
+        check_world(world)
+        return stats
+    if phase == "draw":
+        if window is None:
+            return {"skipped": "no rendering context"}
+        from world_renderer import WorldRenderer
+        renderer = WorldRenderer(world)
+
+        def draw(n):
+            window.clear()
+            renderer.draw()
+            window.ctx.finish()  # Wait for the GPU so the draw is really included
+        return time_calls(draw, iterations)
+    raise ValueError(f"unknown phase {phase}")
+
+
+def open_window():
+    try:
+        import arcade
+        return arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, "Teraform benchmark", visible=False)
+    except Exception as error:
+        print(f"Rendering will be skipped: {error}", file=sys.stderr)
+        return None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    # Prints how each phase's mean changed against an earlier results file
+    for size, phases in results["scenarios"].items():
+        for phase, stats in phases.items():
+            old_stats = baseline.get("scenarios", {}).get(size, {}).get(phase, {})
+            if "mean_ms" in stats and old_stats.get("mean_ms"):
+                ratio = stats["mean_ms"] / old_stats["mean_ms"]
+                print(f"{size:>6} {phase:<26} {old_stats['mean_ms']:>10.4f} -> {stats['mean_ms']:>10.4f} ms "
+                      f"({ratio:.2f}x)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Teraform tick on synthetic planets")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="stationary particle counts")
+    parser.add_argument("--phases", nargs="+", default=PHASES, choices=PHASES)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--no-render", action="store_true", help="skip the draw phase")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="an earlier results file to compare the means against")
+    parser.add_argument("--fixtures", help="directory of saved planets to load instead of building them, "
+                                           "missing ones are built and saved there")
+    args = parser.parse_args()
+
+    window = None if args.no_render or "draw" not in args.phases else open_window()
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "scenarios": {},
+    }
+    for size in args.sizes:
+        results["scenarios"][str(size)] = {
+            phase: benchmark_phase(phase, size, args.iterations, window, args.fixtures) for phase in args.phases
+        }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare, "r") as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
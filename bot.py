@@ -0,0 +1,165 @@
+# bot.py plays the game by trying each input on a fork of the world and picking the one that works out best
+import math
+import time
+import numpy as np
+from arcade import key
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from particles import STATIONARY
+from replay import PRESS, RELEASE
+
+# Each action is a key to hold for HOLD_TICKS, or None to leave things as they are for as long
+ACTIONS = [None, key.W, key.A, key.S, key.D, key.UP, key.DOWN, key.LEFT, key.RIGHT, key.RETURN]
+HOLD_TICKS = 30
+# How many ticks ahead of the decision each action is played out at most. The rollouts take a
+# tick each in turn, and the decision goes by the last round they all finished, so a world
+# with too much going on to get this far in the HOLD_TICKS frames a search has just gets
+# looked at less far ahead.
+HORIZON = 120
+# Seconds of searching per frame, so the bot never holds up drawing
+TIME_BUDGET = 0.004
+# A rollout that hits the sun scores this much less than any that doesn't
+GAME_OVER_PENALTY = 1000000
+# What a point of planet score is worth against a pixel of distance between a steerable
+# particle and the middle of the screen. A particle that is lost, off the screen or in a
+# reaction that destroys it, counts as LOST_DISTANCE away.
+SCORE_WEIGHT = 1000
+LOST_DISTANCE = math.hypot(SCREEN_WIDTH, SCREEN_HEIGHT)
+
+
+def free_positions(world):
+    # Where the particles that aren't part of the planet are. A fork lays its rows out
+    # differently from the world it came from, so these are sorted rather than taken by row.
+    store = world.particles
+    rows = np.flatnonzero(store.state[:store.count] != STATIONARY)
+    return sorted(zip(store.x[rows].tolist(), store.y[rows].tolist()))
+
+
+class Rollout:
+    # Plays one action out on a fork of root, which is already at the decision tick. held_key
+    # is the key the bot is holding until then, released as the action starts.
+    def __init__(self, root, held_key, action):
+        self.action = action
+        self.world = root.fork()
+        self.release_tick = root.tick + HOLD_TICKS
+        # The particles the keys can steer now, to see where each one ends up
+        self.watched_particles = [particle for particles in self.world.steerable_particles.values()
+                                  for particle in particles]
+        if held_key is not None:
+            self.world.release_key(held_key)
+        if action is not None:
+            self.world.press_key(action)
+
+    def step(self):
+        if self.world.is_game_over:
+            return
+        if self.action is not None and self.world.tick == self.release_tick:
+            self.world.release_key(self.action)
+        self.world.step()
+        self.world.sound_events.clear()
+
+    def value(self):
+        world = self.world
+        if world.is_game_over:
+            # Hitting the sun later is still better than hitting it sooner
+            return world.tick - GAME_OVER_PENALTY
+        # Score decides, and between equal scores the rollout that brings its particles closest
+        # to landing on the planet wins
+        distance = 0
+        for particle in self.watched_particles:
+            if particle in world.moving_particles:
+                distance += math.hypot(particle.center_x - SCREEN_WIDTH / 2, particle.center_y - SCREEN_HEIGHT / 2)
+            elif particle not in world.stationary_particles:
+                distance += LOST_DISTANCE
+        return world.score * SCORE_WEIGHT - distance
+
+
+# Looks for the action to take at decision_tick. The world is forked a decision early and
+# played on to decision_tick with the bot's current key held, the same as the real game will
+# be, and every action is played out from there. The work is spread over the frames until
+# decision_tick, so the choice is made on the state it will be applied to. Every step of it
+# checks the deadline, so no call runs more than about a tick or a fork past it.
+class Search:
+    def __init__(self, world, held_key, decision_tick, actions):
+        self.root = world.fork()
+        self.held_key = held_key
+        self.decision_tick = decision_tick
+        self.actions = actions
+        self.rollouts = []
+        # Rounds every rollout has been stepped for, the rollout to step next in this round,
+        # and each rollout's value after the last full round
+        self.depth = 0
+        self.next_rollout = 0
+        self.values = None
+
+    def advance(self, deadline):
+        while self.root.tick < self.decision_tick:
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            self.root.step()
+            self.root.sound_events.clear()
+        while len(self.rollouts) < len(self.actions):
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            self.rollouts.append(Rollout(self.root, self.held_key, self.actions[len(self.rollouts)]))
+        while self.depth < HORIZON:
+            while self.next_rollout < len(self.rollouts):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return
+                self.rollouts[self.next_rollout].step()
+                self.next_rollout += 1
+            self.next_rollout = 0
+            self.depth += 1
+            self.values = [rollout.value() for rollout in self.rollouts]
+
+    def has_values(self):
+        return self.values is not None
+
+    def matches(self, world):
+        # False if the world went another way than the one searched, like after a player's key
+        root = self.root
+        return (root.tick == world.tick and root.score == world.score
+                and len(root.stationary_particles) == len(world.stationary_particles)
+                and free_positions(root) == free_positions(world))
+
+    def best_action(self):
+        # Ties go to the earliest action, which is doing nothing
+        return self.actions[self.values.index(max(self.values))]
+
+
+# Picks an action every HOLD_TICKS ticks by searching ahead on forks of the world. With
+# time_budget None each search runs in one call, for headless games.
+class SearchBot:
+    def __init__(self, actions=ACTIONS, time_budget=TIME_BUDGET):
+        self.actions = actions
+        self.time_budget = time_budget
+        self.search = None
+        self.held_key = None
+        self.next_decision_tick = 0
+        self.decisions = 0
+        # Decisions whose search didn't get through a round in time or was of a world that went
+        # another way
+        self.missed_decisions = 0
+
+    def step(self, world, send_key):
+        # send_key(PRESS or RELEASE, key) sends a key to the world the way the player's keys go
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        if world.tick < self.next_decision_tick:
+            if self.search is not None:
+                self.search.advance(deadline)
+            return
+
+        action = None
+        if self.search is not None:
+            if self.search.has_values() and self.search.matches(world):
+                action = self.search.best_action()
+            else:
+                self.missed_decisions += 1
+        self.decisions += 1
+        if self.held_key is not None:
+            send_key(RELEASE, self.held_key)
+        self.held_key = action
+        if action is not None:
+            send_key(PRESS, action)
+        self.next_decision_tick = world.tick + HOLD_TICKS
+        self.search = Search(world, self.held_key, self.next_decision_tick, self.actions)
+        self.search.advance(deadline)
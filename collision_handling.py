@@ -1,78 +1,67 @@
 # collision_handling.py
 import math
-import arcade
 from constants import SCREEN_WIDTH, SCREEN_HEIGHT
-from particles import LightGreyParticle, PositiveParticle, NegativeParticle, FireParticle, RadioactiveParticle
-import random
-import sun
+from particles import LightGreyParticle, PositiveParticle, NegativeParticle, FireParticle, RadioactiveParticle, MOVING
 
-# Sound effects
-attraction_sound = arcade.load_sound("assets/sounds/attraction_sound.wav")
-repulsion_sound = arcade.load_sound("assets/sounds/repulsion_sound.wav")
-explosion_sound = arcade.load_sound("assets/sounds/explosion_sound.wav")
-alignment_sound = arcade.load_sound("assets/sounds/alignment_sound.wav")
-radioactive_emission_sound = arcade.load_sound("assets/sounds/radioactive_emission_sound.wav")
+# All handlers take the World that owns the particles and stationary/moving sets as their first argument.
+# They update the sets straight away but only queue particles to be added to or removed from
+# world.particles, which the World applies once the tick is done.
 
-# Two sets to track moving and stationary particles
-moving_particles = set()
-stationary_particles = set()
 
-
-def safe_remove_particles(particle1, particle2, particles):
+def safe_remove_particles(world, particle1, particle2):
     # Remove particles from their respective sets
-    if particle1 in moving_particles:
-        moving_particles.discard(particle1)
-    if particle2 in moving_particles:
-        moving_particles.discard(particle2)
-    if particle1 in stationary_particles:
-        stationary_particles.discard(particle1)
-    if particle2 in stationary_particles:
-        stationary_particles.discard(particle2)
-    # Remove particles from the main particles list
-    if particle1 in particles:
-        particles.remove(particle1)
-    if particle2 in particles:
-        particles.remove(particle2)
-
-
-def detect_collision(particles, delta_time, sun):
-    global moving_particles, stationary_particles
-    for particle in particles:
-        particle.update()
-
-        # Handle collision for FireParticle
-        if isinstance(particle, FireParticle):
-            handle_fire_particle_collision(particle, particles, sun)
-
-        # Check for screen boundary for all particles
-        if particle.center_x < 0 or particle.center_x > SCREEN_WIDTH or particle.center_y < 0 or particle.center_y > SCREEN_HEIGHT:
-            particles.remove(particle)
-
-        # Collision detection and handling for moving particles
-        if particle in moving_particles:
-            for stationary_particle in stationary_particles:
-                if arcade.check_for_collision(particle, stationary_particle):
-                    handle_collision(particle, stationary_particle, particles)
-                    break  # Once a collision is handled, move to the next particle
-
-
-def handle_collision(moving_particle, stationary_particle, particles):
+    world.discard_moving_particle(particle1)
+    world.discard_moving_particle(particle2)
+    if particle1 in world.stationary_particles:
+        world.discard_stationary_particle(particle1)
+    if particle2 in world.stationary_particles:
+        world.discard_stationary_particle(particle2)
+    # Take them out of the main particles list at the end of the tick
+    world.despawn_particle(particle1)
+    world.despawn_particle(particle2)
+
+
+def detect_collision(world):
+    particles = world.particles
+    # Move every particle in one batch, which also finds the particles that left the screen
+    off_screen_particles = particles.integrate()
+
+    # Handle collision for FireParticle
+    for particle in particles.of_type(FireParticle):
+        handle_fire_particle_collision(world, particle)
+
+    # Remove particles that left the screen
+    for particle in off_screen_particles:
+        world.despawn_particle(particle)
+        world.discard_moving_particle(particle)
+
+    # Collision detection and handling for moving particles
+    for particle in particles.with_state(MOVING):
+        if particle not in world.moving_particles:
+            continue  # Already snapped or removed by an earlier collision this tick
+        for stationary_particle in world.stationary_grid.nearby(particle.center_x, particle.center_y):
+            if particle.collides_with(stationary_particle):
+                handle_collision(world, particle, stationary_particle)
+                break  # Once a collision is handled, move to the next particle
+
+
+def handle_collision(world, moving_particle, stationary_particle):
     if isinstance(stationary_particle, RadioactiveParticle) or isinstance(moving_particle, RadioactiveParticle):
-        arcade.play_sound(explosion_sound)
-        safe_remove_particles(moving_particle, stationary_particle, particles)
+        world.play_sound("explosion")
+        safe_remove_particles(world, moving_particle, stationary_particle)
 
     else:
-        arcade.play_sound(alignment_sound)
-        # Set the speed and angle of both particles
+        world.play_sound("alignment")
+        # Stop the moving particle, stationary particles are already stopped with an angle of 0
         moving_particle.angle = 0
-        stationary_particle.angle = 0
         moving_particle.speed = 0
 
-        align_particles(moving_particle, stationary_particle)
-        check_adjacent_particles(particles, sun)
+        align_particles(world, moving_particle, stationary_particle)
+        with world.profiler.phase("adjacency"):
+            check_adjacent_particles(world, moving_particle)
 
 
-def align_particles(moving_particle, stationary_particle):
+def align_particles(world, moving_particle, stationary_particle):
     # Determine x and y differences
     x_diff = moving_particle.center_x - stationary_particle.center_x
     y_diff = moving_particle.center_y - stationary_particle.center_y
@@ -93,35 +82,38 @@ def align_particles(moving_particle, stationary_particle):
         moving_particle.left = round(stationary_particle.left)
 
     # Move the moving particle to stationary particles set
-    moving_particles.discard(moving_particle)
-    stationary_particles.add(moving_particle)
+    world.discard_moving_particle(moving_particle)
+    world.add_stationary_particle(moving_particle)
 
 
-def check_adjacent_particles(particles, sun):
-    # Create a copy of stationary_particles for safe iteration
-    stationary_particles_copy = set(stationary_particles)
+def check_adjacent_particles(world, snapped_particle):
+    # Only pairs that include the particle that just snapped can be new. Every other adjacent
+    # pair was already resolved when its own particles snapped, so look at the lattice
+    # neighbours of the snapped particle instead of scanning all stationary pairs.
+    neighbours = [particle for particle in
+                  world.stationary_grid.nearby(snapped_particle.center_x, snapped_particle.center_y)
+                  if particle is not snapped_particle and check_proximity(snapped_particle, particle)]
 
-    for particle1 in stationary_particles_copy:
-        for particle2 in stationary_particles_copy:
+    for neighbour in neighbours:
+        # Visit both orderings of each pair, as the all-pairs scan did
+        check_adjacent_pair(world, snapped_particle, neighbour)
+        check_adjacent_pair(world, neighbour, snapped_particle)
 
-            # Skip checking a particle against itself
-            if particle1 is particle2:
-                continue
 
-            if check_proximity(particle1, particle2):
-                # Skip radioactive particles
-                if isinstance(particle1, RadioactiveParticle) or isinstance(particle2, RadioactiveParticle):
-                    continue
+def check_adjacent_pair(world, particle1, particle2):
+    # Skip radioactive particles
+    if isinstance(particle1, RadioactiveParticle) or isinstance(particle2, RadioactiveParticle):
+        return
 
-                # repel same charge particles
-                if isinstance(particle1, PositiveParticle) and isinstance(particle2, PositiveParticle) or \
-                        isinstance(particle1, NegativeParticle) and isinstance(particle2, NegativeParticle):
-                    handle_repulsion(particle1, particle2, particles, sun)
+    # repel same charge particles
+    if isinstance(particle1, PositiveParticle) and isinstance(particle2, PositiveParticle) or \
+            isinstance(particle1, NegativeParticle) and isinstance(particle2, NegativeParticle):
+        handle_repulsion(world, particle1, particle2)
 
-                # attract opposite charge particles
-                if isinstance(particle1, PositiveParticle) and isinstance(particle2, NegativeParticle) or \
-                        isinstance(particle1, NegativeParticle) and isinstance(particle2, PositiveParticle):
-                    handle_attraction(particle1, particle2, particles)
+    # attract opposite charge particles
+    if isinstance(particle1, PositiveParticle) and isinstance(particle2, NegativeParticle) or \
+            isinstance(particle1, NegativeParticle) and isinstance(particle2, PositiveParticle):
+        handle_attraction(world, particle1, particle2)
 
 
 def check_proximity(particle1, particle2):
@@ -135,13 +127,13 @@ def check_proximity(particle1, particle2):
     return squared_distance <= proximity_threshold
 
 
-def handle_repulsion(particle1, particle2, particles, sun):
-    arcade.play_sound(repulsion_sound)
+def handle_repulsion(world, particle1, particle2):
+    world.play_sound("repulsion")
     # Calculate the midpoint between the two colliding particles
     mid_x = (particle1.center_x + particle2.center_x) / 2
     mid_y = (particle1.center_y + particle2.center_y) / 2
 
-    safe_remove_particles(particle1, particle2, particles)
+    safe_remove_particles(world, particle1, particle2)
 
     # Create a FireParticle at this midpoint
     fire_particle = FireParticle(mid_x, mid_y)
@@ -154,16 +146,16 @@ def handle_repulsion(particle1, particle2, particles, sun):
     fire_particle.angle = angle_away_from_center
 
     # Add the FireParticle to the particles list
-    particles.append(fire_particle)
+    world.spawn_particle(fire_particle)
 
 
-def handle_attraction(particle1, particle2, particles):
-    arcade.play_sound(attraction_sound)
+def handle_attraction(world, particle1, particle2):
+    world.play_sound("attraction")
     # Create two neutral light grey particles
     neutral_particle1 = LightGreyParticle()
     neutral_particle2 = LightGreyParticle()
 
-    safe_remove_particles(particle1, particle2, particles)
+    safe_remove_particles(world, particle1, particle2)
 
     # Position them at the same locations as the original particles
     neutral_particle1.center_x, neutral_particle1.center_y = particle1.center_x, particle1.center_y
@@ -174,22 +166,22 @@ def handle_attraction(particle1, particle2, particles):
     neutral_particle2.speed = 0
 
     # Add the new neutral particles to the stationary set and the main particles list
-    stationary_particles.add(neutral_particle1)
-    stationary_particles.add(neutral_particle2)
-    particles.append(neutral_particle1)
-    particles.append(neutral_particle2)
+    world.add_stationary_particle(neutral_particle1)
+    world.add_stationary_particle(neutral_particle2)
+    world.spawn_particle(neutral_particle1)
+    world.spawn_particle(neutral_particle2)
 
 
-def handle_fire_particle_collision(particle, particles, sun):
-    if arcade.check_for_collision(particle, sun):
-        particles.remove(particle)
-        emit_radioactive_particles(particle, particles)
+def handle_fire_particle_collision(world, particle):
+    if world.sun.collides_with(particle):
+        world.despawn_particle(particle)
+        emit_radioactive_particles(world, particle)
         return True
     return False
 
 
-def emit_radioactive_particles(particle, particles):
-    arcade.play_sound(radioactive_emission_sound)
+def emit_radioactive_particles(world, particle):
+    world.play_sound("radioactive_emission")
     base_angle_away_from_sun = math.degrees(
         math.atan2(SCREEN_HEIGHT / 2 - particle.center_y, SCREEN_WIDTH / 2 - particle.center_x))
     for i in range(2):
@@ -197,13 +189,9 @@ def emit_radioactive_particles(particle, particles):
         radioactive_particle.center_x = particle.center_x
         radioactive_particle.center_y = particle.center_y
 
-        angle_deviation = random.uniform(-30, 30)
+        angle_deviation = world.rng.uniform(-30, 30)
         radioactive_particle.angle = base_angle_away_from_sun + angle_deviation
         radioactive_particle.speed = 0.2
 
-        moving_particles.add(radioactive_particle)
-        particles.append(radioactive_particle)
-
-
-
-
+        world.add_moving_particle(radioactive_particle)
+        world.spawn_particle(radioactive_particle)
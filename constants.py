@@ -13,6 +13,10 @@ ORBIT_SPEED = 0.3
 PARTICLE_EMISSION_MIN_TIME = 2  # Minimum time in seconds
 PARTICLE_EMISSION_MAX_TIME = 6  # Maximum time in seconds
 
+# Constants for the simulation loop
+SIM_TICK = 1 / 60  # The world always advances in steps of this many seconds
+MAX_TICKS_PER_FRAME = 5  # Cap on catch-up steps per rendered frame
+
 # Particle Colors
 COLOR_LIGHT_GREY = arcade.color.LIGHT_GRAY
 COLOR_DARK_GREY = arcade.color.DARK_GRAY
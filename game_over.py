@@ -1,6 +1,7 @@
 # game_over.py
 import arcade
-from scoring import Scoring
+from sprite_pool import get_texture
+from text_block import TextBlock
 
 
 class GameOverScreen:
@@ -10,57 +11,76 @@ class GameOverScreen:
         self.game_over_scroll_speed = 0.5
         self.player_name = ""
         self.is_high_score = False
-        self.scoring = Scoring("high_score.txt")
+        # The game window's high score table, so a score entered there shows up here too
+        self.scoring = game_window.scoring
+        # Made on the first draw, by when the asset manager has loaded the sun
+        self.sun_sprite = None
+        self.exit_text = arcade.Text("Exit", 10, 10, arcade.color.WHITE, 14, font_name="Kenney Blocks")
+        # The scrolling text is laid out once and only laid out again when what it shows changes
+        self.text_block = TextBlock()
+        self.text_content = None
         self.load_credits_text()
 
     def load_credits_text(self):
         with open("credits.txt", "r") as file:
             self.credits_text = file.read()
+        self.text_content = None
+
+    def scrolling_text_content(self):
+        return self.scoring.version, self.is_high_score, self.player_name, self.game_window.current_score
 
     def draw(self):
         # Draw the background
         arcade.draw_lrwh_rectangle_textured(0, 0, self.game_window.width, self.game_window.height, self.game_window.background)
 
         # Draw the sun sprite
-        sun_center_x = self.game_window.width / 2
-        sun_center_y = self.game_window.height / 2
-        sun_sprite = arcade.Sprite("assets/images/SunSprite.png", center_x=sun_center_x, center_y=sun_center_y)
-        sun_sprite.draw()
+        if self.sun_sprite is None:
+            self.sun_sprite = arcade.Sprite(texture=get_texture("assets/images/SunSprite.png"),
+                                            center_x=self.game_window.width / 2, center_y=self.game_window.height / 2)
+        self.sun_sprite.draw()
 
         # Draw scrolling text
         self.draw_scrolling_text()
 
         # Draw "Exit" button
-        arcade.draw_text("Exit", 10, 10, arcade.color.WHITE, 14, font_name="Kenney Blocks")
+        self.exit_text.draw()
 
     def draw_scrolling_text(self):
-        start_y = self.game_over_scroll_y
+        content = self.scrolling_text_content()
+        if content != self.text_content:
+            self.layout_scrolling_text()
+            self.text_content = content
+        self.text_block.draw(self.game_over_scroll_y, self.game_window.height)
+
+    def layout_scrolling_text(self):
+        # Offsets are from the scroll position
+        self.text_block.clear()
+        x = self.game_window.width / 2
+        y_offset = 0
 
-        # Draw credits
+        # Credits
         for line in self.credits_text.split('\n'):
-            arcade.draw_text(line, self.game_window.width / 2, start_y + 1200, arcade.color.WHITE, font_size=40, anchor_x="center",
-                             font_name="Kenney Mini Square")
-            start_y -= 40 # Move down for the next line
+            self.text_block.add_line(line, x, y_offset + 1200, arcade.color.WHITE, 40, anchor_x="center",
+                                     font_name="Kenney Mini Square")
+            y_offset -= 40 # Move down for the next line
 
-        # Draw high scores using the Scoring object
+        # High scores from the Scoring object
         top_scores = self.scoring.get_top_high_scores()
         for i, (name, score) in enumerate(top_scores):
-            arcade.draw_text(f"{i + 1}. {name} - {score}", self.game_window.width / 2, start_y + 1000 - i * 60,
-                             arcade.color.WHITE,
-                             font_size=40, anchor_x="center", font_name="Kenney Mini Square")
+            self.text_block.add_line(f"{i + 1}. {name} - {score}", x, y_offset + 1000 - i * 60, arcade.color.WHITE, 40,
+                                     anchor_x="center", font_name="Kenney Mini Square")
 
         # High scores and input box if high score achieved
         if self.is_high_score:
-            arcade.draw_text(self.player_name, self.game_window.width / 2, start_y + 150,
-                             arcade.color.WHITE, font_size=40, anchor_x="center", font_name="Kenney Mini Square")
-            arcade.draw_text(f"Congratulations! \n You scored: {self.game_window.current_score} \n Enter Name:",
-                             self.game_window.width / 2, start_y + 100,
-                             arcade.color.WHITE, font_size=40, anchor_x="center", font_name="Kenney Mini Square")
-
-        # Draw "GAME OVER" text
-        arcade.draw_text("GAME OVER", self.game_window.width / 2, start_y -100, arcade.color.WHITE, 100,
-                         anchor_x="center",
-                         font_name="Kenney Blocks")
+            self.text_block.add_line(self.player_name, x, y_offset + 150, arcade.color.WHITE, 40, anchor_x="center",
+                                     font_name="Kenney Mini Square")
+            self.text_block.add_line(f"Congratulations! \n You scored: {self.game_window.current_score} \n Enter Name:",
+                                     x, y_offset + 100, arcade.color.WHITE, 40, anchor_x="center",
+                                     font_name="Kenney Mini Square")
+
+        # "GAME OVER" text
+        self.text_block.add_line("GAME OVER", x, y_offset - 100, arcade.color.WHITE, 100, anchor_x="center",
+                                 font_name="Kenney Blocks")
 
     def update(self, delta_time):
         # Update the y-coordinate for scrolling
@@ -1,10 +1,11 @@
 # game_window.py
-import random
-import time
-from square_building import group_particles_by_type, find_3x3_squares
-from sun import Sun
-from particles import *
-from collision_handling import detect_collision, stationary_particles, moving_particles
+from constants import *
+from world import World
+from world_renderer import WorldRenderer
+from asset_manager import assets
+from replay import InputLog, PRESS, RELEASE
+from save_game import SAVE_FILE, save_world, world_to_bytes
+from sound_effects import SoundEffects
 from scoring import Scoring
 from sound_track import SoundTrack
 from welcome import WelcomeScreen
@@ -12,94 +13,160 @@ from game_over import GameOverScreen
 
 
 class MyGame(arcade.Window):
-    def __init__(self, title):
+    # world is a World to carry on with, like a resumed save, instead of starting a new one.
+    # bot is a bot.SearchBot to play the game, its keys are recorded like the player's.
+    def __init__(self, title, seed=None, profile_log=None, world=None, bot=None):
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, title, fullscreen=True)
+        # Only what the welcome screen shows is loaded up front, setup preloads the rest
+        assets.load_group("welcome")
         self.game_state = "WELCOME"
         self.paused = False
-        self.sun = None
-        self.light_grey_particle = None
-        self.particle_timer = 0
-        self.next_particle_time = random.uniform(PARTICLE_EMISSION_MIN_TIME, PARTICLE_EMISSION_MAX_TIME)
-        self.particles = arcade.SpriteList()
-        self.background = arcade.load_texture("assets/images/galaxy_background.png")
-        self.scoring = Scoring("high_score.txt")
+        self.is_new_world = world is None
+        self.world = World(seed) if world is None else world
+        # Keys sent to the world, saved on game over so the game can be replayed. A resumed game
+        # keeps the state it started from, since its seed alone can't rebuild it.
+        self.input_log = InputLog(self.world.seed,
+                                  start_state=None if self.is_new_world else world_to_bytes(self.world))
+        # A replay.ReplayDriver when watching a recorded game instead of playing
+        self.replay = None
+        self.bot = bot
+        # Per-phase frame timings, shown with F3 and optionally streamed to a CSV or JSONL file
+        self.profiler = self.world.profiler
+        self.show_profiler = False
+        self.frame_ticks = 0
+        if profile_log:
+            self.profiler.open_log(profile_log)
+            self.profiler.enabled = True
+        # Real time not yet simulated, in seconds
+        self.tick_accumulator = 0
+        self.world_renderer = None
+        # SPACE was pressed, the game starts once the game assets are loaded and on the GPU
+        self.start_requested = False
+        self.background = assets.get("assets/images/galaxy_background.png")
+        self.scoring = Scoring()
         self.current_score = 0
+        # HUD text, only changed when the scores it shows change
+        self.high_score_text = arcade.Text("", 10, SCREEN_HEIGHT - 30, arcade.color.WHITE, 14, font_name="Kenney Blocks")
+        self.score_text = arcade.Text("", SCREEN_WIDTH - 250, SCREEN_HEIGHT - 30, arcade.color.WHITE, 14,
+                                      font_name="Kenney Blocks")
+        self.exit_text = arcade.Text("Exit", 10, 10, arcade.color.WHITE, 14, font_name="Kenney Blocks")
+        self.hud_high_score_version = None
+        self.hud_score = None
         self.sound_track = SoundTrack()
+        self.sound_effects = SoundEffects()
 
         # Initialize the different screens
         self.welcome_screen = WelcomeScreen(self)
         self.game_over_screen = GameOverScreen(self)
 
     def setup(self):
-        self.sun = Sun("assets/images/SunSprite.png", scale=1.05,
-                       orbit_radius=ORBIT_RADIUS, orbit_speed=ORBIT_SPEED)
+        assets.preload(["game"])
+        if self.is_new_world:
+            self.world.setup()
 
-        # Commenting out the single light grey particle
-        self.light_grey_particle = LightGreyParticle()
-        self.light_grey_particle.center_x = SCREEN_WIDTH / 2
-        self.light_grey_particle.center_y = SCREEN_HEIGHT / 2
-        self.light_grey_particle.speed = 0
-        self.particles.append(self.light_grey_particle)
-        stationary_particles.add(self.light_grey_particle)
+    def start_game(self):
+        # The renderer needs the game textures, which are loaded by the time the game starts
+        if self.world_renderer is None:
+            self.world_renderer = WorldRenderer(self.world, self.background)
+        self.start_requested = False
+        self.game_state = "GAME"
 
     def on_draw(self):
+        assets.mark("first_frame")
         arcade.start_render()
         if self.game_state == "WELCOME":
             self.sound_track.play_background_noise()
             self.welcome_screen.draw()
         elif self.game_state == "GAME":
             self.sound_track.stop_background_noise()
-            self.draw_game_screen()
+            with self.profiler.phase("draw"):
+                self.draw_game_screen()
+            if self.show_profiler:
+                self.draw_profiler_overlay()
+            sprite_pool = self.world_renderer.sprite_pool
+            self.profiler.end_frame(ticks=self.frame_ticks, particles=len(self.world.particles),
+                                    moving=len(self.world.moving_particles),
+                                    stationary=len(self.world.stationary_particles),
+                                    sprite_hits=sprite_pool.hits, sprite_misses=sprite_pool.misses)
+            sprite_pool.reset_counters()
         elif self.game_state == "GAME_OVER":
             self.sound_track.play_background_noise()
             self.game_over_screen.draw()
 
     def draw_game_screen(self):
-        arcade.draw_lrwh_rectangle_textured(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, self.background)
-        self.sun.draw()
-        for particle in self.particles:
-            particle.draw()
+        # The renderer draws the background along with the planet
+        self.world_renderer.draw()
 
         # Display the high score and current score
-        top_high_score = self.scoring.get_top_high_scores(1)
-        high_score_name, high_score = top_high_score[0] if top_high_score else ("", 0)
-        arcade.draw_text(f"High Score: {high_score_name} - {high_score}", 10, SCREEN_HEIGHT - 30, arcade.color.WHITE, 14, font_name="Kenney Blocks")
-        self.current_score = sum(particle.gravitational_value for particle in stationary_particles)
-        arcade.draw_text(f"Current Score: {self.current_score}", SCREEN_WIDTH - 250, SCREEN_HEIGHT - 30, arcade.color.WHITE, 14, font_name="Kenney Blocks")
-        arcade.draw_text("Exit", 10, 10, arcade.color.WHITE, 14, font_name="Kenney Blocks")
+        if self.scoring.version != self.hud_high_score_version:
+            high_score_name, high_score = self.scoring.top_score or ("", 0)
+            self.high_score_text.text = f"High Score: {high_score_name} - {high_score}"
+            self.hud_high_score_version = self.scoring.version
+        self.current_score = self.world.score
+        if self.current_score != self.hud_score:
+            self.score_text.text = f"Current Score: {self.current_score}"
+            self.hud_score = self.current_score
+        self.high_score_text.draw()
+        self.score_text.draw()
+        self.exit_text.draw()
+
+    def draw_profiler_overlay(self):
+        y = SCREEN_HEIGHT - 60
+        for line in self.profiler.overlay_lines():
+            arcade.draw_text(line, 10, y, arcade.color.WHITE, 12, font_name=("Courier New", "Courier"))
+            y -= 16
 
     def update(self, delta_time):
         if self.game_state == "WELCOME":
             self.welcome_screen.update(delta_time)
+            # Get the game textures onto the GPU before the player starts
+            uploaded = assets.upload_next_texture(self.ctx.default_atlas)
+            # Starting any sooner would load what's missing on this thread and stall the frame
+            if self.start_requested and assets.is_preloaded() and not uploaded:
+                self.start_game()
         elif self.game_state == "GAME":
-            now = time.time()
-            self.sound_track.play_next_track(now)
-            self.update_game_screen(delta_time)
+            self.sound_track.play_next_track()
+            with self.profiler.phase("update"):
+                self.update_game_screen(delta_time)
         elif self.game_state == "GAME_OVER":
             self.game_over_screen.update(delta_time)
 
     def update_game_screen(self, delta_time):
-        if not self.paused:
-            self.sun.update()
-            # Update all particles instead of just self.light_grey_particle
-
-            self.particle_timer += delta_time
-            if self.particle_timer >= self.next_particle_time:
-                self.particle_timer = 0
-                self.next_particle_time = random.uniform(PARTICLE_EMISSION_MIN_TIME, PARTICLE_EMISSION_MAX_TIME)
-                new_particle = self.sun.emit_particle()
-                self.particles.append(new_particle)
-            detect_collision(self.particles, delta_time, self.sun)
-            groups = group_particles_by_type(stationary_particles)
-            find_3x3_squares(groups, stationary_particles, moving_particles, self.particles)
-            for particle in stationary_particles:
-                if arcade.check_for_collision(particle, self.sun):
-                    self.game_over()
-            for particle in self.particles:
-                particle.update()
+        self.frame_ticks = 0
+        if self.paused:
+            return
+
+        # Advance the world in fixed ticks so game speed doesn't depend on the frame rate
+        self.tick_accumulator += delta_time
+        if self.bot is not None and self.replay is None and not self.world.is_game_over:
+            self.bot.step(self.world, self.send_key)
+        ticks = 0
+        while self.tick_accumulator >= SIM_TICK and not self.world.is_game_over:
+            if self.replay is not None and self.replay.is_finished(self.world):
+                break
+            if ticks == MAX_TICKS_PER_FRAME:
+                # Too far behind to catch up, so drop the backlog rather than spiral
+                self.tick_accumulator = 0
+                break
+            if self.replay is not None:
+                self.replay.step(self.world)
+            else:
+                self.world.step(SIM_TICK)
+            self.tick_accumulator -= SIM_TICK
+            ticks += 1
+        self.frame_ticks = ticks
+
+        self.sound_effects.play(self.world.pop_sound_events())
+        if self.world.is_game_over or (self.replay is not None and self.replay.is_finished(self.world)):
+            self.game_over()
 
     def game_over(self):
-        self.current_score = sum(particle.gravitational_value for particle in stationary_particles)
+        self.current_score = self.world.score
+        if self.replay is not None:
+            self.close()
+            return
+        self.input_log.end_tick = self.world.tick
+        self.input_log.save()
         if self.scoring.is_high_score(self.current_score):
             self.game_over_screen.is_high_score = True
             self.game_over_screen.player_name = ""
@@ -131,70 +198,49 @@ class MyGame(arcade.Window):
                 self.game_state = "GAME_OVER"
                 return
 
+            # F5 saves the game and quits, main.py --resume carries on from the save
+            if key == arcade.key.F5 and self.replay is None:
+                save_world(self.world)
+                print(f"Saved the game to {SAVE_FILE}")
+                self.close()
+                return
+
         if self.game_state == "WELCOME":
             if key == arcade.key.SPACE:
-                self.game_state = "GAME"
+                self.start_requested = True
                 return
 
-        elif self.game_state == "GAME":
-            # Define movement angles
-            move_up_angle = 90
-            move_down_angle = 270
-            move_right_angle = 0
-            move_left_angle = 180
-
-            # Iterate over moving particles and change direction based on key press
-            for particle in moving_particles:
-                if isinstance(particle, PositiveParticle):
-                    if key == arcade.key.W:
-                        particle.angle = move_down_angle
-                    elif key == arcade.key.S:
-                        particle.angle = move_up_angle
-                    elif key == arcade.key.A:
-                        particle.angle = move_right_angle
-                    elif key == arcade.key.D:
-                        particle.angle = move_left_angle
-
-                elif isinstance(particle, NegativeParticle):
-                    if key == arcade.key.W:
-                        particle.angle = move_up_angle
-                    elif key == arcade.key.S:
-                        particle.angle = move_down_angle
-                    elif key == arcade.key.A:
-                        particle.angle = move_left_angle
-                    elif key == arcade.key.D:
-                        particle.angle = move_right_angle
-
-                elif isinstance(particle, LightGreyParticle):
-                    if key == arcade.key.UP:
-                        particle.angle = move_up_angle
-                    elif key == arcade.key.DOWN:
-                        particle.angle = move_down_angle
-                    elif key == arcade.key.LEFT:
-                        particle.angle = move_left_angle
-                    elif key == arcade.key.RIGHT:
-                        particle.angle = move_right_angle
-
-            if key == arcade.key.RETURN:
-                self.sun.reverse_orbit_direction()
+        elif self.game_state == "GAME" and self.replay is None:
+            self.send_key(PRESS, key)
 
             # Toggle pause state only when in GAME state
             if key == arcade.key.P:
                 self.paused = not self.paused
 
+            # Toggle the frame profiler overlay
+            if key == arcade.key.F3:
+                self.show_profiler = not self.show_profiler
+                self.profiler.enabled = self.show_profiler or self.profiler.log_file is not None
+
         super().on_key_press(key, modifiers)
 
     def on_key_release(self, key, modifiers):
         super().on_key_release(key, modifiers)
 
-        # Set angles of moving particles towards the center on key release
-        if key in [arcade.key.W, arcade.key.A, arcade.key.S, arcade.key.D, arcade.key.UP, arcade.key.DOWN,
-                   arcade.key.LEFT, arcade.key.RIGHT]:
-            center_x = SCREEN_WIDTH / 2
-            center_y = SCREEN_HEIGHT / 2
-            for particle in moving_particles:
-                if isinstance(particle, (PositiveParticle, NegativeParticle, LightGreyParticle)):
-                    particle.angle = particle.angle_towards_center(center_x, center_y)
+        if self.game_state == "GAME" and self.replay is None:
+            self.send_key(RELEASE, key)
+
+    def send_key(self, action, key):
+        self.input_log.record(self.world.tick, action, key)
+        if action == PRESS:
+            self.world.press_key(key)
+        else:
+            self.world.release_key(key)
+
+    def close(self):
+        self.profiler.close_log()
+        self.scoring.close()
+        super().close()
 
     def on_mouse_press(self, x, y, button, modifiers):
         if 0 <= x <= 100 and 0 <= y <= 20:  # Specific area for exit
@@ -0,0 +1,129 @@
+# layered.py
+# A dict and a set that fork in constant time, for World.fork. What a container holds when it
+# is forked is frozen into a layer that it and the fork share, and from then on each one keeps
+# only its own changes on top of the shared layers.
+MISSING = object()
+# Marks a key that was deleted while a shared layer below still has it
+DELETED = object()
+# A container forked after changes gets one layer deeper, and every lookup that misses has to
+# go through all of them, so past this many the layers are merged into one
+MAX_LAYERS = 8
+
+
+class LayeredDict:
+    def __init__(self):
+        self.changes = {}
+        # Frozen dicts shared with forks, newest first. Nothing changes a dict once it is here.
+        self.layers = ()
+        self.length = 0
+
+    def fork(self):
+        if self.changes:
+            self.layers = (self.changes,) + self.layers
+            self.changes = {}
+            if len(self.layers) > MAX_LAYERS:
+                self.layers = (self.merged(),)
+        layered = object.__new__(type(self))
+        layered.changes = {}
+        layered.layers = self.layers
+        layered.length = self.length
+        return layered
+
+    def merged(self):
+        merged = {}
+        for layer in reversed(self.layers):
+            merged.update(layer)
+        merged.update(self.changes)
+        return {key: value for key, value in merged.items() if value is not DELETED}
+
+    def get(self, key, default=None):
+        value = self.changes.get(key, MISSING)
+        if value is MISSING:
+            for layer in self.layers:
+                value = layer.get(key, MISSING)
+                if value is not MISSING:
+                    break
+            else:
+                return default
+        if value is DELETED:
+            return default
+        return value
+
+    def getter(self):
+        # get, or the dict's own get while nothing is shared, which is quicker in a hot loop
+        return self.get if self.layers else self.changes.get
+
+    def value_to_change(self, key, make):
+        # The value for key made this container's own before it is changed in place, copied
+        # with make(value) if it is shared with a fork. A missing key gets make().
+        value = self.changes.get(key, MISSING)
+        if value is not MISSING and value is not DELETED:
+            return value
+        value = self.get(key, MISSING)
+        value = make() if value is MISSING else make(value)
+        self[key] = value
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self.length += 1
+        self.changes[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.length -= 1
+        if self.layers:
+            self.changes[key] = DELETED
+        else:
+            del self.changes[key]
+
+    def pop(self, key, default=None):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            return default
+        del self[key]
+        return value
+
+    def setdefault(self, key, default=None):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            self[key] = value = default
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def __len__(self):
+        return self.length
+
+    def items(self):
+        if not self.layers:
+            return self.changes.items()
+        return self.merged().items()
+
+    def keys(self):
+        return (key for key, value in self.items())
+
+    def values(self):
+        return (value for key, value in self.items())
+
+    def __iter__(self):
+        return self.keys()
+
+
+class LayeredSet(LayeredDict):
+    # The items are the keys of a LayeredDict
+    def add(self, item):
+        if item not in self:
+            self[item] = True
+
+    def discard(self, item):
+        if item in self:
+            del self[item]
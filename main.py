@@ -1,13 +1,28 @@
 # main.py is the main file that runs the game
+import argparse
+import json
 import arcade
+from asset_manager import assets
+from bot import SearchBot
 from game_window import MyGame
 from constants import SCREEN_TITLE
+from save_game import SAVE_FILE, load_world
 
 
 def main():
-    window = MyGame(SCREEN_TITLE)
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument("--profile-log", help="stream per-frame phase timings to this .csv or .jsonl file")
+    parser.add_argument("--asset-timings", action="store_true", help="print how long each asset took to load on exit")
+    parser.add_argument("--resume", nargs="?", const=SAVE_FILE, help="carry on from a game saved with F5")
+    parser.add_argument("--bot", action="store_true", help="let a bot that searches ahead steer the particles")
+    args = parser.parse_args()
+
+    world = load_world(args.resume) if args.resume else None
+    window = MyGame(SCREEN_TITLE, profile_log=args.profile_log, world=world, bot=SearchBot() if args.bot else None)
     window.setup()
     arcade.run()
+    if args.asset_timings:
+        print(json.dumps(assets.timing_report(), indent=2))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+# particle_store.py
+import numpy as np
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from particles import STATIONARY
+
+# Float and integer columns of the store, one row per particle
+FLOAT_COLUMNS = ("x", "y", "vx", "vy", "speed", "angle")
+INT_COLUMNS = ("type_id", "state")
+
+
+# Structure-of-arrays storage for the world's particles. Motion and screen-bounds culling
+# run as a few NumPy operations over all rows instead of a Python update per particle.
+# It also behaves like the list it replaces: append, remove, in, len and iteration.
+# A forked store also holds stationary particles that belong to the store it was forked from
+# without having rows for them, see fork.
+class ParticleStore:
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.particles = []
+        # The LayeredSet of particles borrowed from another store, None if there are none
+        self.borrowed = None
+        for column in FLOAT_COLUMNS:
+            setattr(self, column, np.zeros(capacity, dtype=np.float64))
+        self.type_id = np.zeros(capacity, dtype=np.int16)
+        self.state = np.zeros(capacity, dtype=np.int8)
+
+    def grow(self):
+        capacity = len(self.x) * 2
+        for column in FLOAT_COLUMNS + INT_COLUMNS:
+            old_column = getattr(self, column)
+            new_column = np.zeros(capacity, dtype=old_column.dtype)
+            new_column[:self.count] = old_column[:self.count]
+            setattr(self, column, new_column)
+
+    def append(self, particle):
+        if particle._store is self:
+            return
+        if self.count == len(self.x):
+            self.grow()
+        row = self.count
+        self.x[row] = particle._x
+        self.y[row] = particle._y
+        self.vx[row] = particle._vx
+        self.vy[row] = particle._vy
+        self.speed[row] = particle._speed
+        self.angle[row] = particle._angle
+        self.type_id[row] = particle.type_id
+        self.state[row] = particle._state
+        particle._store = self
+        particle._index = row
+        self.particles.append(particle)
+        self.count += 1
+
+    def remove(self, particle):
+        if particle._store is not self:
+            if self.borrowed is not None and particle in self.borrowed:
+                # The particle's own store still has its values and it has no row here
+                self.borrowed.discard(particle)
+                return
+            raise ValueError("particle is not in this store")
+        row = particle._index
+        # Copy the values back onto the particle so it can still be read after removal
+        particle._x = self.x[row].item()
+        particle._y = self.y[row].item()
+        particle._vx = self.vx[row].item()
+        particle._vy = self.vy[row].item()
+        particle._speed = self.speed[row].item()
+        particle._angle = self.angle[row].item()
+        particle._state = int(self.state[row])
+        particle._store = None
+        particle._index = None
+
+        # Fill the hole with the last row so the live rows stay packed
+        last = self.count - 1
+        if row != last:
+            for column in FLOAT_COLUMNS + INT_COLUMNS:
+                values = getattr(self, column)
+                values[row] = values[last]
+            moved_particle = self.particles[last]
+            moved_particle._index = row
+            self.particles[row] = moved_particle
+        self.particles.pop()
+        self.count -= 1
+
+    def load(self, particles, columns):
+        # Fills an empty store in one go from a column of values per FLOAT_COLUMNS and INT_COLUMNS
+        count = len(particles)
+        while len(self.x) < count:
+            self.grow()
+        for column in FLOAT_COLUMNS + INT_COLUMNS:
+            getattr(self, column)[:count] = columns[column]
+        for row, particle in enumerate(particles):
+            particle._store = self
+            particle._index = row
+        self.particles = list(particles)
+        self.count = count
+
+    def fork(self, stationary_particles):
+        # A copy of the store, and a dict from each of its moving and free particles to the copy
+        # of that particle in the new store. Only those get rows. Stationary particles never
+        # change, so the new store borrows them as stationary_particles, a LayeredSet fork of
+        # the world's, and the copy costs nothing for the planet however big it is.
+        rows = np.flatnonzero(self.state[:self.count] != STATIONARY)
+        store = ParticleStore(max(1024, 2 * len(rows)))
+        store.count = len(rows)
+        for column in FLOAT_COLUMNS + INT_COLUMNS:
+            getattr(store, column)[:store.count] = getattr(self, column)[rows]
+        copies = {}
+        for new_row, row in enumerate(rows.tolist()):
+            particle = self.particles[row]
+            particle_copy = object.__new__(type(particle))
+            particle_copy.__dict__.update(particle.__dict__)
+            particle_copy._store = store
+            particle_copy._index = new_row
+            store.particles.append(particle_copy)
+            copies[particle] = particle_copy
+        store.borrowed = stationary_particles
+        return store, copies
+
+    def unshared(self):
+        # This store with a row for each borrowed particle too, for reading every particle's
+        # values from the columns as save_game does. The borrowed handles aren't changed.
+        if self.borrowed is None:
+            return self
+        store = ParticleStore(max(1024, len(self)))
+        for column in FLOAT_COLUMNS + INT_COLUMNS:
+            getattr(store, column)[:self.count] = getattr(self, column)[:self.count]
+        store.particles = list(self.particles)
+        for row, particle in enumerate(self.borrowed, self.count):
+            source = particle._store
+            for column in FLOAT_COLUMNS + INT_COLUMNS:
+                if column == "type_id":
+                    value = particle.type_id
+                elif source is None:
+                    value = getattr(particle, "_" + column)
+                else:
+                    value = getattr(source, column)[particle._index]
+                getattr(store, column)[row] = value
+            store.particles.append(particle)
+        store.count = len(store.particles)
+        return store
+
+    def integrate(self):
+        # Move every particle by its velocity and return the ones that left the screen. The
+        # planet can grow past the edge of the screen, but its particles stay part of it.
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        x += self.vx[:n]
+        y += self.vy[:n]
+        off_screen = ((x < 0) | (x > SCREEN_WIDTH) | (y < 0) | (y > SCREEN_HEIGHT)) & (self.state[:n] != STATIONARY)
+        return [self.particles[row] for row in np.flatnonzero(off_screen)]
+
+    # The queries below only look at rows, so they never return borrowed particles. They return
+    # particles by position rather than by row, because a world and its forks lay their rows
+    # out differently and the order particles are handled in has to be the same in all of them.
+    def in_position_order(self, rows):
+        rows = rows[np.lexsort((self.x[rows], self.y[rows]))]
+        return [self.particles[row] for row in rows.tolist()]
+
+    def with_state(self, state):
+        return self.in_position_order(np.flatnonzero(self.state[:self.count] == state))
+
+    def without_state(self, state):
+        return self.in_position_order(np.flatnonzero(self.state[:self.count] != state))
+
+    def of_type(self, particle_type):
+        return self.in_position_order(np.flatnonzero(self.type_id[:self.count] == particle_type.type_id))
+
+    def __contains__(self, particle):
+        if getattr(particle, "_store", None) is self:
+            return True
+        return self.borrowed is not None and particle in self.borrowed
+
+    def __iter__(self):
+        # Iterate over a copy so particles can be added or removed while looping
+        if self.borrowed is None:
+            return iter(list(self.particles))
+        return iter(self.particles + list(self.borrowed))
+
+    def __len__(self):
+        if self.borrowed is None:
+            return self.count
+        return self.count + len(self.borrowed)
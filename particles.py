@@ -3,20 +3,151 @@ import math
 from constants import *
 
 
-class Particle(arcade.Sprite):
-    def __init__(self, image_file, width, height, gravitational_value):
-        super().__init__(image_file, scale=1)
+# Values of a particle's state column
+FREE = 0        # Moves on its own and can't be steered, like a FireParticle
+MOVING = 1      # In World.moving_particles
+STATIONARY = 2  # Part of the planet, in World.stationary_particles
+
+
+# Particles are plain data so the simulation can run without a window. The image file is
+# only used by the game window to pick the texture the particle is drawn with.
+# Once a particle is added to a ParticleStore its position, velocity and state live in the
+# store's arrays and the particle is just a handle to its row. Removing it copies the
+# values back, so a removed particle can still be read.
+class Particle:
+    # The old per-sprite update ran twice per frame, so a particle moves speed * 2 per tick
+    moves_per_tick = 2
+    type_id = None
+
+    # Each particle class draws with a single image, so its texture can be loaded once up front
+    image_file = None
+
+    def __init__(self, width, height, gravitational_value):
         self.width = width
         self.height = height
         self.gravitational_value = gravitational_value
+        self.is_neutral = True  # Default value for neutral particles
+        self._store = None
+        self._index = None
+        self._x = 0
+        self._y = 0
+        self._vx = 0
+        self._vy = 0
+        self._speed = 0
+        self._angle = 0
+        self._state = FREE
         self.speed = 0.5
         self.angle = 0
-        self.is_neutral = True  # Default value for neutral particles
 
-    def update(self):
-        # Update position based on speed and angle
-        self.center_x += self.speed * math.cos(math.radians(self.angle))
-        self.center_y += self.speed * math.sin(math.radians(self.angle))
+    @property
+    def center_x(self):
+        if self._store is None:
+            return self._x
+        return self._store.x[self._index]
+
+    @center_x.setter
+    def center_x(self, value):
+        if self._store is None:
+            self._x = value
+        else:
+            self._store.x[self._index] = value
+
+    @property
+    def center_y(self):
+        if self._store is None:
+            return self._y
+        return self._store.y[self._index]
+
+    @center_y.setter
+    def center_y(self, value):
+        if self._store is None:
+            self._y = value
+        else:
+            self._store.y[self._index] = value
+
+    @property
+    def speed(self):
+        if self._store is None:
+            return self._speed
+        return self._store.speed[self._index]
+
+    @speed.setter
+    def speed(self, value):
+        if self._store is None:
+            self._speed = value
+        else:
+            self._store.speed[self._index] = value
+        self.update_velocity()
+
+    @property
+    def angle(self):
+        if self._store is None:
+            return self._angle
+        return self._store.angle[self._index]
+
+    @angle.setter
+    def angle(self, value):
+        if self._store is None:
+            self._angle = value
+        else:
+            self._store.angle[self._index] = value
+        self.update_velocity()
+
+    @property
+    def state(self):
+        if self._store is None:
+            return self._state
+        return self._store.state[self._index]
+
+    @state.setter
+    def state(self, value):
+        if self._store is None:
+            self._state = value
+        else:
+            self._store.state[self._index] = value
+
+    def update_velocity(self):
+        # Velocity is only recomputed when speed or angle change, not on every tick
+        distance = self.speed * self.moves_per_tick
+        vx = distance * math.cos(math.radians(self.angle))
+        vy = distance * math.sin(math.radians(self.angle))
+        if self._store is None:
+            self._vx, self._vy = vx, vy
+        else:
+            self._store.vx[self._index] = vx
+            self._store.vy[self._index] = vy
+
+    @property
+    def left(self):
+        return self.center_x - self.width / 2
+
+    @left.setter
+    def left(self, value):
+        self.center_x = value + self.width / 2
+
+    @property
+    def right(self):
+        return self.center_x + self.width / 2
+
+    @right.setter
+    def right(self, value):
+        self.center_x = value - self.width / 2
+
+    @property
+    def bottom(self):
+        return self.center_y - self.height / 2
+
+    @bottom.setter
+    def bottom(self, value):
+        self.center_y = value + self.height / 2
+
+    @property
+    def top(self):
+        return self.center_y + self.height / 2
+
+    @top.setter
+    def top(self, value):
+        self.center_y = value - self.height / 2
 
     def angle_towards_center(self, center_x, center_y):
         # Calculate the angle towards the center of the screen
@@ -24,63 +155,68 @@ class Particle(arcade.Sprite):
         dy = center_y - self.center_y
         return math.degrees(math.atan2(dy, dx))
 
+    def collides_with(self, other):
+        # Particles are 20x20 squares, so overlapping bounding boxes means a collision
+        return abs(self.center_x - other.center_x) < (self.width + other.width) / 2 and \
+            abs(self.center_y - other.center_y) < (self.height + other.height) / 2
+
 
 class LightGreyParticle(Particle):
+    image_file = "assets/images/light_grey_rock.png"
+
     def __init__(self):
-        super().__init__("assets/images/light_grey_rock.png", 20, 20, 1)
+        super().__init__(20, 20, 1)
 
 
 class BrownParticle(Particle):
+    image_file = "assets/images/brown_rock.png"
+
     def __init__(self):
-        super().__init__("assets/images/brown_rock.png", 20, 20, 2)
+        super().__init__(20, 20, 2)
 
 
 class MeltingParticle(Particle):
+    image_file = "assets/images/melting_rock.png"
+
     def __init__(self):
-        super().__init__("assets/images/melting_rock.png", 20, 20, 3)
+        super().__init__(20, 20, 3)
 
 
 class MagmaParticle(Particle):
+    image_file = "assets/images/magma.png"
+
     def __init__(self):
-        super().__init__("assets/images/magma.png", 20, 20, 4)
+        super().__init__(20, 20, 4)
 
 
 class WhiteParticle(Particle):
+    image_file = "assets/images/white_particle.png"
+
     def __init__(self):
-        super().__init__("assets/images/white_particle.png", 20, 20, 5)
+        super().__init__(20, 20, 5)
 
 
 class PositiveParticle(Particle):
-    instances = []
+    image_file = "assets/images/blue_energy.png"
 
     def __init__(self):
-        super().__init__("assets/images/blue_energy.png", 20, 20, 0)
-        PositiveParticle.instances.append(self)
+        super().__init__(20, 20, 0)
         self.is_neutral = False
 
-    @classmethod
-    def remove_instance(cls, instance):
-        if instance in cls.instances:
-            cls.instances.remove(instance)
-
 
 class NegativeParticle(Particle):
-    instances = []
+    image_file = "assets/images/red_energy.png"
 
     def __init__(self):
-        super().__init__("assets/images/red_energy.png", 20, 20, 0)
-        NegativeParticle.instances.append(self)
+        super().__init__(20, 20, 0)
         self.is_neutral = False
 
-    @classmethod
-    def remove_instance(cls, instance):
-        if instance in cls.instances:
-            cls.instances.remove(instance)
-
 
 class FireParticle(Particle):
+    image_file = "assets/images/purple_energy.png"
+
     def __init__(self, initial_x, initial_y):
-        super().__init__("assets/images/purple_energy.png", 20, 20, 0)
+        super().__init__(20, 20, 0)
         self.center_x = initial_x
         self.center_y = initial_y
         dx = SCREEN_WIDTH / 2 - self.center_x
@@ -88,21 +224,16 @@ class FireParticle(Particle):
         self.angle = math.degrees(math.atan2(dy, dx)) + 180
         self.speed = 0.5
 
-    def update(self):
-        super().update()
-
 
 class RadioactiveParticle(Particle):
+    image_file = "assets/images/green_triangle.png"
+    # RadioactiveParticle.update used to move the particle twice per call, so speed * 4 per tick
+    moves_per_tick = 4
+
     def __init__(self):
-        super().__init__("assets/images/green_triangle.png", 20, 20, 0)
+        super().__init__(20, 20, 0)
         self.speed = 0.2
 
-    def update(self):
-        super().update()
-        # Update position based on speed and direction
-        self.center_x += self.speed * math.cos(math.radians(self.angle))
-        self.center_y += self.speed * math.sin(math.radians(self.angle))
-
 
 GRAVITATIONAL_MAPPING = {
     1: LightGreyParticle,
@@ -111,4 +242,10 @@ GRAVITATIONAL_MAPPING = {
     4: MagmaParticle,
     5: WhiteParticle,
     # ... continue mapping for other particle types
-}
\ No newline at end of file
+}
+
+# Every particle class, indexed by the type_id stored in the ParticleStore
+PARTICLE_TYPES = [LightGreyParticle, BrownParticle, MeltingParticle, MagmaParticle, WhiteParticle,
+                  PositiveParticle, NegativeParticle, FireParticle, RadioactiveParticle]
+for particle_type_id, particle_type in enumerate(PARTICLE_TYPES):
+    particle_type.type_id = particle_type_id
@@ -0,0 +1,129 @@
+# profiler.py
+import gc
+import json
+import time
+from collections import deque
+
+# Phases in the order they are shown. Adjacency is timed inside collision, and sprites
+# inside draw, so those totals include them. gc is the time spent in garbage collection
+# pauses, wherever they happened in the frame.
+PHASES = ["update", "emission", "collision", "adjacency", "squares", "sun_check", "draw", "sprites", "gc"]
+COUNTS = ["ticks", "particles", "moving", "stationary", "sprite_hits", "sprite_misses"]
+
+
+class PhaseTimer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        frame_times = self.profiler.frame_times
+        frame_times[self.name] = frame_times.get(self.name, 0) + time.perf_counter() - self.start
+        return False
+
+
+class NullTimer:
+    # Used while profiling is off, so a timed phase only costs an empty with block
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+# Times each phase of a frame and keeps rolling p50/p95/max over the last few seconds.
+# Frames can optionally be streamed to a CSV or JSONL file as they finish.
+class FrameProfiler:
+    def __init__(self, window_size=240):
+        self._enabled = False
+        self.gc_start = None
+        self.frame = 0
+        self.frame_times = {}
+        self.history = {phase: deque(maxlen=window_size) for phase in PHASES}
+        self.counts = {}
+        self.log_file = None
+        self.log_is_csv = False
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        # The gc hook is only installed while profiling, so idle profilers cost nothing
+        if enabled and not self._enabled:
+            gc.callbacks.append(self.on_gc)
+        elif self._enabled and not enabled:
+            gc.callbacks.remove(self.on_gc)
+            self.gc_start = None
+        self._enabled = enabled
+
+    def on_gc(self, gc_phase, info):
+        if gc_phase == "start":
+            self.gc_start = time.perf_counter()
+        elif self.gc_start is not None:
+            self.frame_times["gc"] = self.frame_times.get("gc", 0) + time.perf_counter() - self.gc_start
+            self.gc_start = None
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return PhaseTimer(self, name)
+
+    def open_log(self, file_name):
+        self.log_is_csv = file_name.endswith(".csv")
+        self.log_file = open(file_name, "w")
+        if self.log_is_csv:
+            self.log_file.write(",".join(["frame"] + [f"{phase}_ms" for phase in PHASES] + COUNTS) + "\n")
+
+    def close_log(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+        self.enabled = False
+
+    def end_frame(self, **counts):
+        if not self.enabled:
+            return
+        self.frame += 1
+        self.counts = counts
+        for phase in PHASES:
+            self.history[phase].append(self.frame_times.get(phase, 0))
+        if self.log_file is not None:
+            self.write_frame()
+        self.frame_times = {}
+
+    def write_frame(self):
+        times_ms = [round(self.frame_times.get(phase, 0) * 1000, 4) for phase in PHASES]
+        if self.log_is_csv:
+            row = [self.frame] + times_ms + [self.counts.get(name, 0) for name in COUNTS]
+            self.log_file.write(",".join(str(value) for value in row) + "\n")
+        else:
+            record = {"frame": self.frame}
+            record.update({f"{phase}_ms": value for phase, value in zip(PHASES, times_ms)})
+            record.update(self.counts)
+            self.log_file.write(json.dumps(record) + "\n")
+
+    def stats(self, phase):
+        # p50, p95 and max in milliseconds over the rolling window
+        times = sorted(self.history[phase])
+        if not times:
+            return 0, 0, 0
+        return (times[len(times) // 2] * 1000, times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+                times[-1] * 1000)
+
+    def overlay_lines(self):
+        lines = ["phase        p50    p95    max ms"]
+        for phase in PHASES:
+            p50, p95, worst = self.stats(phase)
+            lines.append(f"{phase:<10} {p50:6.2f} {p95:6.2f} {worst:6.2f}")
+        lines.append("  ".join(f"{name} {self.counts.get(name, 0)}" for name in COUNTS))
+        return lines
@@ -0,0 +1,152 @@
+# replay.py records the keys sent to the World during a game and plays them back
+import argparse
+import base64
+import json
+import time
+import arcade
+from constants import SIM_TICK, SCREEN_TITLE
+from world import World
+from save_game import world_from_bytes
+
+REPLAY_FILE = "last_game.replay"
+PRESS = "p"
+RELEASE = "r"
+
+
+class InputLog:
+    def __init__(self, seed, events=None, end_tick=None, start_state=None):
+        self.seed = seed
+        # A save_game snapshot the game was resumed from, or None for a game played from the start
+        self.start_state = start_state
+        # (tick, PRESS or RELEASE, key code), in the order they happened
+        self.events = events if events is not None else []
+        self.end_tick = end_tick
+
+    def record(self, tick, action, key):
+        self.events.append((tick, action, key))
+
+    def save(self, file_name=REPLAY_FILE):
+        data = {"version": 1, "seed": self.seed, "end_tick": self.end_tick, "events": self.events}
+        if self.start_state is not None:
+            data["start_state"] = base64.b64encode(self.start_state).decode("ascii")
+        with open(file_name, "w") as file:
+            json.dump(data, file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, file_name=REPLAY_FILE):
+        with open(file_name, "r") as file:
+            data = json.load(file)
+        events = [(tick, action, key) for tick, action, key in data["events"]]
+        start_state = base64.b64decode(data["start_state"]) if "start_state" in data else None
+        return cls(data["seed"], events, data["end_tick"], start_state)
+
+    def start_world(self):
+        if self.start_state is not None:
+            return world_from_bytes(self.start_state)
+        world = World(seed=self.seed)
+        world.setup()
+        return world
+
+
+class ReplayDriver:
+    # Steps a World through a recorded game, timing every tick
+    def __init__(self, input_log):
+        self.input_log = input_log
+        self.next_event = 0
+        self.tick_times = []
+        self.particle_counts = []
+
+    def apply_events(self, world):
+        # Keys recorded at tick N were pressed after N steps, so they go in before step N + 1
+        events = self.input_log.events
+        while self.next_event < len(events) and events[self.next_event][0] <= world.tick:
+            tick, action, key = events[self.next_event]
+            if action == PRESS:
+                world.press_key(key)
+            else:
+                world.release_key(key)
+            self.next_event += 1
+
+    def step(self, world):
+        self.apply_events(world)
+        start = time.perf_counter()
+        world.step(SIM_TICK)
+        self.tick_times.append(time.perf_counter() - start)
+        self.particle_counts.append(len(world.particles))
+
+    def is_finished(self, world):
+        end_tick = self.input_log.end_tick
+        return world.is_game_over or (end_tick is not None and world.tick >= end_tick)
+
+    def timing_report(self):
+        tick_times = sorted(self.tick_times)
+        if not tick_times:
+            return {"ticks": 0}
+        total = sum(tick_times)
+
+        def percentile(fraction):
+            return tick_times[min(len(tick_times) - 1, int(fraction * len(tick_times)))] * 1000
+
+        slowest_tick = max(range(len(self.tick_times)), key=self.tick_times.__getitem__)
+        return {
+            "ticks": len(tick_times),
+            "total_seconds": round(total, 3),
+            "ticks_per_second": round(len(tick_times) / total, 1) if total else None,
+            "mean_ms": round(total / len(tick_times) * 1000, 4),
+            "p50_ms": round(percentile(0.5), 4),
+            "p95_ms": round(percentile(0.95), 4),
+            "p99_ms": round(percentile(0.99), 4),
+            "max_ms": round(tick_times[-1] * 1000, 4),
+            "slowest_tick": slowest_tick + 1,
+            "max_particles": max(self.particle_counts),
+        }
+
+    def save_tick_times(self, file_name):
+        with open(file_name, "w") as file:
+            file.write("tick,ms,particles\n")
+            for tick, (tick_time, particle_count) in enumerate(zip(self.tick_times, self.particle_counts), 1):
+                file.write(f"{tick},{tick_time * 1000:.4f},{particle_count}\n")
+
+
+def run_headless(input_log):
+    world = input_log.start_world()
+    driver = ReplayDriver(input_log)
+    while not driver.is_finished(world):
+        driver.step(world)
+        world.pop_sound_events()
+    return world, driver
+
+
+def run_visual(input_log):
+    # The game window is only imported for visual replays, which need a display
+    from game_window import MyGame
+    window = MyGame(SCREEN_TITLE, seed=input_log.seed, world=input_log.start_world())
+    window.replay = ReplayDriver(input_log)
+    window.setup()
+    window.start_requested = True
+    arcade.run()
+    return window.world, window.replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Teraform game")
+    parser.add_argument("replay_file", nargs="?", default=REPLAY_FILE)
+    parser.add_argument("--visual", action="store_true", help="watch the replay in a window at normal speed")
+    parser.add_argument("--tick-times", help="write the time of every tick to this CSV file")
+    args = parser.parse_args()
+
+    input_log = InputLog.load(args.replay_file)
+    if args.visual:
+        world, driver = run_visual(input_log)
+    else:
+        world, driver = run_headless(input_log)
+
+    report = driver.timing_report()
+    report["score"] = world.score
+    print(json.dumps(report, indent=2))
+    if args.tick_times:
+        driver.save_tick_times(args.tick_times)
+
+
+if __name__ == "__main__":
+    main()
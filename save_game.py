@@ -0,0 +1,150 @@
+# save_game.py saves a World to a compact binary file and loads it back
+import gc
+import struct
+import numpy as np
+from particles import PARTICLE_TYPES, FireParticle, MOVING, STATIONARY
+from world import World
+
+SAVE_FILE = "saved_game.sav"
+MAGIC = b"TERA"
+VERSION = 3
+
+# Everything but the particles, in a fixed layout after the magic and version:
+# seed, tick, sun angle, sun orbit speed (its sign is the orbit direction), sun orbit radius,
+# particle timer, next particle time, game over flag, whether the RNG has a cached gauss value,
+# that value, the particle count, from version 2 the number of squares collapsed and the
+# number of cells waiting to be checked for squares, and from version 3 the emission times
+HEADERS = {1: struct.Struct("<QQdddddBBdI"), 2: struct.Struct("<QQdddddBBdIQI"),
+           3: struct.Struct("<QQdddddBBdIQIdd")}
+HEADER = HEADERS[VERSION]
+# random.Random keeps 624 words of Mersenne Twister state plus its position in them
+RNG_WORDS = 625
+# Particle columns, one array each, written one after the other in this order
+COLUMNS = [("type_id", "<i2"), ("state", "<i1"), ("x", "<f8"), ("y", "<f8"), ("vx", "<f8"), ("vy", "<f8"),
+           ("speed", "<f8"), ("angle", "<f8")]
+# Cells waiting to be checked for squares, after the particle columns. Particles made by a
+# collapse queue their cells for the next tick, so a save between ticks can still have some.
+CHECK_CELL_COLUMNS = [("type_id", "<i2"), ("cell_x", "<i4"), ("cell_y", "<i4")]
+# Then from version 3 the rows of the stationary particles in the order to add them back in.
+# A cell can hold more than one stationary particle, and collisions and collapses take the
+# first one in its bucket, so the buckets have to come back in the same order.
+ORDER_DTYPE = "<u4"
+
+
+def world_to_bytes(world):
+    # Saves happen between ticks, when no spawns or despawns are waiting to be applied
+    rng_version, rng_words, gauss_next = world.rng.getstate()
+    sun = world.sun
+    # A forked world's store borrows its planet, so give those particles rows to write too
+    store = world.particles.unshared()
+    check_cells = world.square_check_cells
+    header = HEADER.pack(world.seed, world.tick, sun.angle, sun.orbit_speed, sun.orbit_radius,
+                         world.particle_timer, world.next_particle_time, world.is_game_over,
+                         gauss_next is not None, gauss_next or 0.0, store.count, world.collapses,
+                         len(check_cells), world.emission_min_time, world.emission_max_time)
+    parts = [MAGIC, struct.pack("<H", VERSION), header, np.array(rng_words, dtype="<u4").tobytes()]
+    for column, dtype in COLUMNS:
+        parts.append(getattr(store, column)[:store.count].astype(dtype).tobytes())
+    check_cell_columns = {
+        "type_id": [particle_type.type_id for particle_type, cell in check_cells],
+        "cell_x": [cell[0] for particle_type, cell in check_cells],
+        "cell_y": [cell[1] for particle_type, cell in check_cells],
+    }
+    for column, dtype in CHECK_CELL_COLUMNS:
+        parts.append(np.array(check_cell_columns[column], dtype=dtype).tobytes())
+    parts.append(np.array(stationary_order(world, store), dtype=ORDER_DTYPE).tobytes())
+    return b"".join(parts)
+
+
+def stationary_order(world, store):
+    # Stationary rows sorted by their place in their stationary_grid bucket. Each type_lattice
+    # bucket is part of a grid bucket in the same order, so that keeps both.
+    bucket_positions = {}
+    for bucket in world.stationary_grid.cells.values():
+        for position, particle in enumerate(bucket):
+            bucket_positions[particle] = position
+    rows = np.flatnonzero(store.state[:store.count] == STATIONARY).tolist()
+    return sorted(rows, key=lambda row: bucket_positions[store.particles[row]])
+
+
+def world_from_bytes(data):
+    if data[:4] != MAGIC:
+        raise ValueError("not a Teraform save")
+    version, = struct.unpack_from("<H", data, 4)
+    if version not in HEADERS:
+        raise ValueError(f"unsupported save version {version}")
+    offset = 6
+    header = HEADERS[version].unpack_from(data, offset)
+    (seed, tick, sun_angle, orbit_speed, orbit_radius, particle_timer, next_particle_time, is_game_over,
+     has_gauss, gauss_next, count) = header[:11]
+    collapses, check_cell_count = header[11:13] if version >= 2 else (0, 0)
+    emission_times = header[13:] if version >= 3 else ()
+    offset += HEADERS[version].size
+    rng_words = np.frombuffer(data, dtype="<u4", count=RNG_WORDS, offset=offset)
+    offset += RNG_WORDS * 4
+    columns = {}
+    for column, dtype in COLUMNS:
+        columns[column] = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += columns[column].nbytes
+    check_cell_columns = {}
+    for column, dtype in CHECK_CELL_COLUMNS:
+        check_cell_columns[column] = np.frombuffer(data, dtype=dtype, count=check_cell_count, offset=offset).tolist()
+        offset += check_cell_count * np.dtype(dtype).itemsize
+    stationary_rows = None
+    if version >= 3:
+        stationary_count = int((columns["state"] == STATIONARY).sum())
+        stationary_rows = np.frombuffer(data, dtype=ORDER_DTYPE, count=stationary_count, offset=offset).tolist()
+
+    world = World(seed, *emission_times)
+    world.rng.setstate((3, tuple(int(word) for word in rng_words), gauss_next if has_gauss else None))
+    world.tick = tick
+    world.sun.angle = sun_angle
+    world.sun.orbit_speed = orbit_speed
+    world.sun.orbit_radius = orbit_radius
+    world.sun.update(0)
+    world.particle_timer = particle_timer
+    world.next_particle_time = next_particle_time
+    world.is_game_over = bool(is_game_over)
+    world.collapses = collapses
+
+    # Every value the store keeps comes from the columns, so each particle is a copy of a
+    # freshly made one of its type rather than going through __init__ again
+    prototypes = [vars(FireParticle(0, 0) if particle_type is FireParticle else particle_type())
+                  for particle_type in PARTICLE_TYPES]
+    # Nothing made here is garbage, so keep the collector from scanning it all part way through
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        particles = []
+        for type_id in columns["type_id"].tolist():
+            particle = object.__new__(PARTICLE_TYPES[type_id])
+            particle.__dict__.update(prototypes[type_id])
+            particles.append(particle)
+        world.particles.load(particles, columns)
+        for particle, state in zip(particles, columns["state"].tolist()):
+            if state == MOVING:
+                world.add_moving_particle(particle)
+            elif state == STATIONARY and stationary_rows is None:
+                world.add_stationary_particle(particle)
+        # Saves before version 3 add the planet back in row order
+        for row in stationary_rows or ():
+            world.add_stationary_particle(particles[row])
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if version >= 2:
+        world.square_check_cells = [(PARTICLE_TYPES[type_id], (cell_x, cell_y)) for type_id, cell_x, cell_y in
+                                    zip(*(check_cell_columns[column] for column, dtype in CHECK_CELL_COLUMNS))]
+    # Version 1 saves didn't keep the cells waiting to be checked, so those games check the whole
+    # planet again on the first tick, as add_stationary_particle queued every cell above
+    return world
+
+
+def save_world(world, file_name=SAVE_FILE):
+    with open(file_name, "wb") as file:
+        file.write(world_to_bytes(world))
+
+
+def load_world(file_name=SAVE_FILE):
+    with open(file_name, "rb") as file:
+        return world_from_bytes(file.read())
@@ -1,31 +1,201 @@
 # scoring.py
+import bisect
+import os
+import queue
+import threading
+import time
+import zlib
+
+SCORE_LOG = "high_score.log"
+# Scores from before the log existed, read once when there is no log yet
+LEGACY_HIGH_SCORE_FILE = "high_score.txt"
+# The log is rewritten without corrupt lines and old history after this many new scores
+COMPACT_EVERY = 50
+# Each player keeps their best score and this many of their most recent ones through a compaction
+HISTORY_PER_PLAYER = 100
+
+
+def checksum(name, score, timestamp):
+    return f"{zlib.crc32(f'{name},{score},{timestamp}'.encode()):08x}"
+
+
+def format_entry(name, score, timestamp):
+    return f"{name},{score},{timestamp},{checksum(name, score, timestamp)}\n"
+
+
+def parse_entry(line):
+    # None for anything that isn't a whole line with a matching checksum
+    if not line.endswith("\n"):
+        return None
+    parts = line.rstrip("\n").rsplit(",", 3)
+    if len(parts) != 4:
+        return None
+    name, score, timestamp, line_checksum = parts
+    if checksum(name, score, timestamp) != line_checksum:
+        return None
+    try:
+        return name, int(score), float(timestamp)
+    except ValueError:
+        return None
+
+
+# Writes the score log on its own thread, so saving a score never holds up a frame. Appends
+# go straight to the end of the log and compactions write a new log next to it and rename it
+# over the old one, so a crash leaves either the old log or the new one but never half of one.
+class ScoreLogWriter:
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="score-log", daemon=True)
+        self.thread.start()
+
+    def append(self, line):
+        self.queue.put(("append", line))
+
+    def compact(self, lines):
+        self.queue.put(("compact", lines))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            kind, data = job
+            try:
+                if kind == "append":
+                    with open(self.log_file, "a") as file:
+                        file.write(data)
+                        file.flush()
+                        os.fsync(file.fileno())
+                else:
+                    temp_file = self.log_file + ".tmp"
+                    with open(temp_file, "w") as file:
+                        file.writelines(data)
+                        file.flush()
+                        os.fsync(file.fileno())
+                    os.replace(temp_file, self.log_file)
+            except OSError as error:
+                print(f"Couldn't save high scores: {error}")
+
+
+# Every score entered, kept in memory and in an append-only log. high_scores is the top 10
+# shown on screen, top_scores can rank any number, and history has each player's scores.
 class Scoring:
-    def __init__(self, high_score_file):
-        self.high_score_file = high_score_file
+    def __init__(self, log_file=SCORE_LOG, legacy_file=LEGACY_HIGH_SCORE_FILE):
+        self.log_file = log_file
+        self.legacy_file = legacy_file
+        # (name, score, timestamp) in the order they were entered
+        self.entries = []
+        # (-score, entry number, name), kept sorted so the top N is a slice
+        self.ranking = []
+        self.history = {}
         self.high_scores = []
-        self.load_high_scores()
+        # The best (name, score), or None while the table is empty
+        self.top_score = None
+        # Bumped whenever the table changes, so screens know to lay their text out again
+        self.version = 0
+        self.added_since_compaction = 0
+        needs_compaction = self.load_high_scores()
+        self.writer = ScoreLogWriter(self.log_file)
+        if needs_compaction:
+            self.compact()
 
     def load_high_scores(self):
+        # Returns True when the log should be rewritten, because it had bad lines or didn't
+        # exist yet. Nothing in a damaged file stops the game from starting.
         try:
-            with open(self.high_score_file, "r") as file:
-                self.high_scores = [line.strip().split(',') for line in file]
-                self.high_scores.sort(key=lambda x: int(x[1]), reverse=True)
+            with open(self.log_file, "r", errors="replace") as file:
+                lines = file.readlines()
         except FileNotFoundError:
+            self.load_legacy_high_scores()
+            self.high_scores_changed()
+            return bool(self.entries)
+        except OSError as error:
+            print(f"Couldn't read high scores: {error}")
+            lines = []
+        bad_lines = 0
+        for line in lines:
+            entry = parse_entry(line)
+            if entry is None:
+                bad_lines += 1
+            else:
+                self.add_entry(*entry)
+        if bad_lines:
+            print(f"Skipped {bad_lines} damaged lines in {self.log_file}")
+        self.high_scores_changed()
+        return bad_lines > 0
+
+    def load_legacy_high_scores(self):
+        try:
+            with open(self.legacy_file, "r") as file:
+                for line in file:
+                    try:
+                        name, score = line.strip().split(',')
+                        self.add_entry(name, int(score), 0)
+                    except ValueError:
+                        pass
+        except OSError:
             pass
 
-    def save_high_scores(self):
-        with open(self.high_score_file, "w") as file:
-            for name, score in self.high_scores:
-                file.write(f"{name},{score}\n")
+    def add_entry(self, name, score, timestamp):
+        bisect.insort(self.ranking, (-score, len(self.entries), name))
+        self.entries.append((name, score, timestamp))
+        self.history.setdefault(name, []).append((score, timestamp))
+
+    def high_scores_changed(self):
+        self.high_scores = self.top_scores(10)
+        self.top_score = self.high_scores[0] if self.high_scores else None
+        self.version += 1
 
     def update_high_scores(self, name, score):
-        self.high_scores.append((name, score))
-        self.high_scores.sort(key=lambda x: int(x[1]), reverse=True)
-        self.high_scores = self.high_scores[:10]  # Keep only top 10 scores
-        self.save_high_scores()
+        timestamp = round(time.time(), 3)
+        self.add_entry(name, score, timestamp)
+        self.high_scores_changed()
+        self.writer.append(format_entry(name, score, timestamp))
+        self.added_since_compaction += 1
+        if self.added_since_compaction >= COMPACT_EVERY:
+            self.compact()
+
+    def compact(self):
+        # Keep the top 10, each player's best score and their most recent ones, in the order
+        # they were entered
+        keep = {index for negative_score, index, name in self.ranking[:10]}
+        best = {}
+        recent_counts = {}
+        for index in range(len(self.entries) - 1, -1, -1):
+            name, score, timestamp = self.entries[index]
+            recent_counts[name] = recent_counts.get(name, 0) + 1
+            if recent_counts[name] <= HISTORY_PER_PLAYER:
+                keep.add(index)
+            if name not in best or score > self.entries[best[name]][1]:
+                best[name] = index
+        keep.update(best.values())
+        entries = [entry for index, entry in enumerate(self.entries) if index in keep]
+
+        self.entries = []
+        self.ranking = []
+        self.history = {}
+        for entry in entries:
+            self.add_entry(*entry)
+        self.writer.compact([format_entry(*entry) for entry in entries])
+        self.added_since_compaction = 0
+
+    def close(self):
+        self.writer.close()
 
     def is_high_score(self, score):
-        return len(self.high_scores) < 10 or score > int(self.high_scores[-1][1])
+        return len(self.high_scores) < 10 or score > self.high_scores[-1][1]
+
+    def top_scores(self, number_of_scores):
+        return [(name, -negative_score) for negative_score, index, name in self.ranking[:number_of_scores]]
+
+    def player_history(self, name):
+        # (score, timestamp) for every score the player entered, oldest first
+        return list(self.history.get(name, []))
 
     def get_top_high_scores(self, number_of_scores=10):
         return self.high_scores[:number_of_scores]
@@ -0,0 +1,95 @@
+# sound_effects.py
+import time
+from pyglet import media
+from asset_manager import assets
+
+# Sound effect files for the sound event names queued by the World
+SOUND_EFFECT_FILES = {
+    "attraction": "assets/sounds/attraction_sound.wav",
+    "repulsion": "assets/sounds/repulsion_sound.wav",
+    "explosion": "assets/sounds/explosion_sound.wav",
+    "alignment": "assets/sounds/alignment_sound.wav",
+    "radioactive_emission": "assets/sounds/radioactive_emission_sound.wav",
+    "positive_emission": "assets/sounds/positive_emission_sound.wav",
+    "negative_emission": "assets/sounds/negative_emission_sound.wav",
+    "neutral_emission": "assets/sounds/neutral_emission_sound.wav",
+}
+
+
+# Higher priority effects take a voice from lower priority ones when all voices are busy
+SOUND_EFFECT_PRIORITIES = {
+    "explosion": 3,
+    "attraction": 2,
+    "repulsion": 2,
+    "radioactive_emission": 2,
+    "alignment": 1,
+    "positive_emission": 0,
+    "negative_emission": 0,
+    "neutral_emission": 0,
+}
+MAX_VOICES = 8
+
+
+# One player that sound effects take turns on
+class Voice:
+    def __init__(self):
+        self.player = media.Player()
+        self.name = None
+        self.priority = -1
+        self.ends_at = 0
+
+    def start(self, name, sound, now):
+        if self.name == name and self.player.source is not None:
+            # Same effect still loaded, so just start it again from the beginning
+            self.player.seek(0)
+        else:
+            if self.player.source is not None:
+                self.player.next_source()
+            self.player.queue(sound.source)
+        self.player.play()
+        self.name = name
+        self.priority = SOUND_EFFECT_PRIORITIES[name]
+        self.ends_at = now + sound.get_length()
+
+
+# Mixes the sound events the World queues. Repeats of an effect in the same batch of events
+# play once, at most MAX_VOICES effects play at a time, and the players are kept and reused.
+# The sounds themselves are preloaded by the asset manager while the welcome screen is up.
+class SoundEffects:
+    def __init__(self, max_voices=MAX_VOICES):
+        self.voices = [Voice() for n in range(max_voices)]
+        # Events merged into another of the same effect, effects that took a busy voice and
+        # effects dropped because every voice had something at least as important
+        self.merged = 0
+        self.stolen = 0
+        self.dropped = 0
+
+    def play(self, sound_events):
+        if not sound_events:
+            return
+        names = list(dict.fromkeys(sound_events))
+        self.merged += len(sound_events) - len(names)
+        now = time.perf_counter()
+        # The most important effects pick their voices first
+        names.sort(key=lambda name: -SOUND_EFFECT_PRIORITIES[name])
+        for name in names:
+            voice = self.find_voice(name, now)
+            if voice is None:
+                self.dropped += 1
+                continue
+            voice.start(name, assets.get(SOUND_EFFECT_FILES[name]), now)
+
+    def find_voice(self, name, now):
+        free_voices = [voice for voice in self.voices if voice.ends_at <= now]
+        if free_voices:
+            # Prefer a voice that last played this effect, it can restart without requeueing
+            for voice in free_voices:
+                if voice.name == name:
+                    return voice
+            return free_voices[0]
+        # Every voice is busy, so take the least important one that started first
+        voice = min(self.voices, key=lambda voice: (voice.priority, voice.ends_at))
+        if voice.priority < SOUND_EFFECT_PRIORITIES[name]:
+            self.stolen += 1
+            return voice
+        return None
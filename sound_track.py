@@ -1,75 +1,105 @@
 # sound_track.py
+import random
 import arcade
+from asset_manager import assets
+
+# Music tracks in the order they play, unless the playlist is shuffled
+PLAYLIST = [
+    "assets/sounds/Billy's Sacrifice.wav",
+    "assets/sounds/Checking Manifest.wav",
+    "assets/sounds/Crash Landing.wav",
+    "assets/sounds/Automatav2.wav",
+    "assets/sounds/City Stomper.wav",
+    "assets/sounds/Parabola.wav",
+    "assets/sounds/Smooth Sailing.wav",
+    "assets/sounds/Race to Mars.wav",
+]
 
 
 class SoundTrack:
-    def __init__(self):
+    def __init__(self, playlist=PLAYLIST, shuffle=False, loop=False):
         # Background noise
-        self.background_noise = arcade.load_sound("assets/sounds/background_noise.wav")
+        self.background_noise = assets.get("assets/sounds/background_noise.wav")
         self.background_noise_playing = False
         self.background_noise_player = None
         self.background_noise_volume = 0.2
-        # Load music tracks
-        self.track1 = arcade.load_sound("assets/sounds/Billy's Sacrifice.wav")
-        self.track2 = arcade.load_sound("assets/sounds/Checking Manifest.wav")
-        self.track3 = arcade.load_sound("assets/sounds/Crash Landing.wav")
-        self.track4 = arcade.load_sound("assets/sounds/Automatav2.wav")
-        self.track5 = arcade.load_sound("assets/sounds/City Stomper.wav")
-        self.track6 = arcade.load_sound("assets/sounds/Parabola.wav")
-        self.track7 = arcade.load_sound("assets/sounds/Smooth Sailing.wav")
-        self.track8 = arcade.load_sound("assets/sounds/Race to Mars.wav")
-        # Add more tracks as needed
+        # Music is streamed from disk as it plays. Only the current track and the one after it
+        # are open at any time
+        self.playlist = list(playlist)
+        self.shuffle = shuffle
+        self.loop = loop
+        self.rng = random.Random()
+        self.order = []
+        self.next_position = 0
+        self.current_track = None
+        self.current_player = None
+        self.next_track = None
+        self.track_finished = False
+        self.playlist_finished = False
+        # Tracks in a row that couldn't be played, so a looping playlist that can't play
+        # anything gives up instead of trying again every update
+        self.failed_tracks = 0
+        self.start_playlist()
 
-        # Track duration in seconds
-        self.track_durations = {
-            self.track1: 234,
-            self.track2: 240,
-            self.track3: 217,
-            self.track4: 246,
-            self.track5: 195,
-            self.track6: 250,
-            self.track7: 205,
-            self.track8: 247,
-            # Add durations for more tracks as needed
-        }
+    def start_playlist(self):
+        self.order = list(self.playlist)
+        if self.shuffle:
+            self.rng.shuffle(self.order)
+        self.next_position = 0
 
-        # Track which song is currently playing and when it started
-        self.current_track = None
-        self.track_start_time = None
+    def next_file_name(self):
+        if self.next_position == len(self.order):
+            if not self.loop or not self.order:
+                return None
+            self.start_playlist()
+        file_name = self.order[self.next_position]
+        self.next_position += 1
+        return file_name
+
+    def open_next_track(self):
+        # Opening a streaming sound only reads the file header, the audio is decoded as it plays
+        for attempt in range(len(self.playlist)):
+            file_name = self.next_file_name()
+            if file_name is None:
+                return None
+            try:
+                return arcade.load_sound(file_name, streaming=True)
+            except FileNotFoundError:
+                print(f"Skipping missing music track {file_name}")
+        return None
+
+    def on_track_end(self):
+        self.track_finished = True
+
+    def play_next_track(self):
+        # Called every update, but only starts a track when none has played yet or the player
+        # reports the current one has ended
+        if self.current_player is not None:
+            if not self.track_finished and not self.current_track.is_complete(self.current_player):
+                return
+            arcade.stop_sound(self.current_player)
+            self.current_player = None
+        elif self.playlist_finished:
+            return
 
-    def play_next_track(self, current_time):
+        if self.next_track is None:
+            self.next_track = self.open_next_track()
+        self.current_track = self.next_track
         if self.current_track is None:
-            self.current_track = self.track1
-            self.track_start_time = current_time
-            arcade.play_sound(self.track1, looping=False)
-        elif self.current_track == self.track1 and (current_time - self.track_start_time) > self.track_durations[self.track1]:
-            self.current_track = self.track2
-            self.track_start_time = current_time
-            arcade.play_sound(self.track2, looping=False)
-        elif self.current_track == self.track2 and (current_time - self.track_start_time) > self.track_durations[self.track2]:
-            self.current_track = self.track3
-            self.track_start_time = current_time
-            arcade.play_sound(self.track3, looping=False)
-        elif self.current_track == self.track3 and (current_time - self.track_start_time) > self.track_durations[self.track3]:
-            self.current_track = self.track4
-            self.track_start_time = current_time
-            arcade.play_sound(self.track4, looping=False)
-        elif self.current_track == self.track4 and (current_time - self.track_start_time) > self.track_durations[self.track4]:
-            self.current_track = self.track5
-            self.track_start_time = current_time
-            arcade.play_sound(self.track5, looping=False)
-        elif self.current_track == self.track5 and (current_time - self.track_start_time) > self.track_durations[self.track5]:
-            self.current_track = self.track6
-            self.track_start_time = current_time
-            arcade.play_sound(self.track6, looping=False)
-        elif self.current_track == self.track6 and (current_time - self.track_start_time) > self.track_durations[self.track6]:
-            self.current_track = self.track7
-            self.track_start_time = current_time
-            arcade.play_sound(self.track7, looping=False)
-        elif self.current_track == self.track7 and (current_time - self.track_start_time) > self.track_durations[self.track7]:
-            self.current_track = self.track8
-            self.track_start_time = current_time
-            arcade.play_sound(self.track8, looping=False)
+            self.playlist_finished = True
+            return
+        self.track_finished = False
+        self.current_player = arcade.play_sound(self.current_track, looping=False)
+        self.next_track = self.open_next_track()
+        if self.current_player is None:
+            # arcade has already printed why it couldn't play the track, the next update moves
+            # on to the one after it
+            self.failed_tracks += 1
+            if self.failed_tracks >= len(self.playlist):
+                self.playlist_finished = True
+            return
+        self.failed_tracks = 0
+        self.current_player.push_handlers(on_player_eos=self.on_track_end)
 
     def play_background_noise(self):
         if not self.background_noise_playing:
@@ -0,0 +1,93 @@
+# spatial_hash.py
+from layered import LayeredDict
+
+# Particles are 20x20 and snap onto a 20px lattice, so one particle per cell
+CELL_SIZE = 20
+
+
+# Both structures fork without copying anything. Their dicts are LayeredDicts, and a bucket
+# shared with a fork is copied by whichever one changes it first.
+class SpatialHash:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = LayeredDict()
+        self.particle_cells = LayeredDict()
+
+    def fork(self):
+        spatial_hash = object.__new__(SpatialHash)
+        spatial_hash.cell_size = self.cell_size
+        spatial_hash.cells = self.cells.fork()
+        spatial_hash.particle_cells = self.particle_cells.fork()
+        return spatial_hash
+
+    def cell_for(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def add(self, particle):
+        cell = self.particle_cells.get(particle)
+        if cell is not None:
+            return cell
+        cell = self.cell_for(particle.center_x, particle.center_y)
+        self.cells.value_to_change(cell, list).append(particle)
+        self.particle_cells[particle] = cell
+        return cell
+
+    def remove(self, particle):
+        cell = self.particle_cells.pop(particle, None)
+        if cell is None:
+            return
+        bucket = self.cells.value_to_change(cell, list)
+        bucket.remove(particle)
+        if not bucket:
+            del self.cells[cell]
+        return cell
+
+    def nearby(self, x, y):
+        # Anything overlapping a 20x20 particle at (x, y) sits in the 3x3 block of cells around it
+        cell_x, cell_y = self.cell_for(x, y)
+        get = self.cells.getter()
+        nearby_particles = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                bucket = get((cell_x + dx, cell_y + dy))
+                if bucket:
+                    nearby_particles.extend(bucket)
+        return nearby_particles
+
+    def __len__(self):
+        return len(self.particle_cells)
+
+
+class TypeLattice:
+    # Stationary particles indexed by (particle type, lattice cell)
+    def __init__(self):
+        self.cells = LayeredDict()
+
+    def fork(self):
+        type_lattice = object.__new__(TypeLattice)
+        type_lattice.cells = self.cells.fork()
+        return type_lattice
+
+    def add(self, particle, cell):
+        self.cells.value_to_change((type(particle), cell), list).append(particle)
+
+    def remove(self, particle, cell):
+        key = (type(particle), cell)
+        bucket = self.cells.get(key)
+        if bucket and particle in bucket:
+            bucket = self.cells.value_to_change(key, list)
+            bucket.remove(particle)
+            if not bucket:
+                del self.cells[key]
+
+    def get(self, particle_type, cell):
+        return self.cells.get((particle_type, cell), ())
+
+    def window(self, particle_type, center_cell, radius=1):
+        # Particles of one type in the (2 * radius + 1) square of cells around center_cell
+        x, y = center_cell
+        window_particles = []
+        for dx in range(-radius, radius + 1):
+            for dy in range(-radius, radius + 1):
+                window_particles.extend(self.get(particle_type, (x + dx, y + dy)))
+        return window_particles
@@ -0,0 +1,44 @@
+# sprite_pool.py
+import arcade
+from collections import defaultdict
+from asset_manager import assets
+
+
+# Textures are loaded once by the asset manager and shared by every sprite drawn with them
+def get_texture(image_file):
+    return assets.get(image_file)
+
+
+# Recycles the sprites particles are drawn with. Particles come and go all the time, so a
+# released sprite is kept and reset for the next particle with the same image instead of
+# building a new one. Hits are sprites reused from the pool and misses are new sprites.
+class SpritePool:
+    def __init__(self):
+        self.free_sprites = defaultdict(list)
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, particle):
+        free_sprites = self.free_sprites[particle.image_file]
+        if free_sprites:
+            self.hits += 1
+            sprite = free_sprites.pop()
+        else:
+            self.misses += 1
+            sprite = arcade.Sprite(texture=get_texture(particle.image_file))
+        sprite.width = particle.width
+        sprite.height = particle.height
+        sprite.center_x = particle.center_x
+        sprite.center_y = particle.center_y
+        sprite.angle = particle.angle
+        return sprite
+
+    def release(self, particle, sprite):
+        self.free_sprites[particle.image_file].append(sprite)
+
+    def free_count(self):
+        return sum(len(free_sprites) for free_sprites in self.free_sprites.values())
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
@@ -1,49 +1,59 @@
 # sun.py
-import random
-from collision_handling import moving_particles
+from PIL import Image
 from particles import LightGreyParticle, PositiveParticle, NegativeParticle
-import arcade
 import math
 from constants import SCREEN_WIDTH, SCREEN_HEIGHT, ORBIT_RADIUS, ORBIT_SPEED
 
+# Sound played for each type of emitted particle
+EMISSION_SOUNDS = {
+    PositiveParticle: "positive_emission",
+    NegativeParticle: "negative_emission",
+    LightGreyParticle: "neutral_emission",
+}
 
-class Sun(arcade.Sprite):
+
+class Sun:
     def __init__(self, image_file, scale=1.05, orbit_radius=ORBIT_RADIUS, orbit_speed=ORBIT_SPEED):
-        super().__init__(image_file, scale)
+        self.image_file = image_file
+        self.scale = scale
+        # Only the image size is needed here, the texture itself is loaded by the game window
+        with Image.open(image_file) as image:
+            image_width, image_height = image.size
+        self.width = image_width * scale
+        self.height = image_height * scale
         self.orbit_radius = orbit_radius
         self.orbit_speed = orbit_speed
         self.orbit_center_x = SCREEN_WIDTH / 2
         self.orbit_center_y = SCREEN_HEIGHT / 2
+        self.center_x = 0
+        self.center_y = 0
         self.angle = 0
-        self.radius = 650
-        self.positive_emission_sound = arcade.load_sound("assets/sounds/positive_emission_sound.wav")
-        self.negative_emission_sound = arcade.load_sound("assets/sounds/negative_emission_sound.wav")
-        self.neutral_emission_sound = arcade.load_sound("assets/sounds/neutral_emission_sound.wav")
+        # The sun image is a disc that fills the texture
+        self.radius = self.width / 2
 
     def reverse_orbit_direction(self):
         self.orbit_speed = -self.orbit_speed
 
-    def emit_particle(self):
-        particle_type = random.choice([LightGreyParticle, PositiveParticle, NegativeParticle])
+    def emit_particle(self, rng):
+        particle_type = rng.choice([LightGreyParticle, PositiveParticle, NegativeParticle])
         particle = particle_type()
 
-        # Play sound based on particle type
-        if isinstance(particle, PositiveParticle):
-            arcade.play_sound(self.positive_emission_sound)
-        elif isinstance(particle, NegativeParticle):
-            arcade.play_sound(self.negative_emission_sound)
-        elif isinstance(particle, LightGreyParticle):
-            arcade.play_sound(self.neutral_emission_sound)
-
         offset = 1  # Offset to place the particle slightly away from the sun's edge
         particle.center_x = self.center_x - ((self.width / 2) + offset) * math.cos(self.angle)
         particle.center_y = self.center_y - ((self.height / 2) + offset) * math.sin(self.angle)
         particle.angle = math.degrees(math.atan2(SCREEN_HEIGHT / 2 - particle.center_y,
                                                  SCREEN_WIDTH / 2 - particle.center_x))
         particle.speed = 0.5
-        moving_particles.add(particle)
         return particle
 
+    def collides_with(self, particle):
+        # Closest point of the particle's box to the sun's center
+        closest_x = min(max(self.center_x, particle.left), particle.right)
+        closest_y = min(max(self.center_y, particle.bottom), particle.top)
+        dx = closest_x - self.center_x
+        dy = closest_y - self.center_y
+        return dx * dx + dy * dy <= self.radius * self.radius
+
     def update(self, delta_time=1 / 60):
         self.angle += self.orbit_speed * delta_time
         self.center_x = self.orbit_center_x + self.orbit_radius * math.cos(self.angle)
@@ -0,0 +1,27 @@
+# text_block.py
+import arcade
+
+
+# Lines of text laid out once and drawn at a scroll position. Each line is an arcade.Text
+# kept between frames, so scrolling only moves the lines, and lines off the screen aren't
+# drawn at all. Call clear and add the lines again when the content changes.
+class TextBlock:
+    def __init__(self):
+        # (arcade.Text, offset from the block's y, margin for off screen checks)
+        self.lines = []
+
+    def add_line(self, text, x, y_offset, color, font_size, **kwargs):
+        line = arcade.Text(text, x, y_offset, color, font_size, **kwargs)
+        # The text hangs below its baseline by a little and a multi line string by a lot more
+        margin = font_size * 2 * (text.count("\n") + 1)
+        self.lines.append((line, y_offset, margin))
+
+    def clear(self):
+        self.lines = []
+
+    def draw(self, y, screen_height):
+        for line, y_offset, margin in self.lines:
+            line_y = y + y_offset
+            if -margin <= line_y <= screen_height + margin:
+                line.y = line_y
+                line.draw()
@@ -1,39 +1,54 @@
 # welcome.py
 import arcade
+from text_block import TextBlock
 
 
 class WelcomeScreen:
     def __init__(self, game_window):
         self.game_window = game_window
         self.scroll_text_y = self.game_window.height * 2.8
+        self.text_block = TextBlock()
+        self.exit_text = arcade.Text("Exit", 10, 10, arcade.color.WHITE, 14, font_name="Kenney Blocks")
+        # Shown if SPACE is pressed before the game assets have finished loading
+        self.loading_text = arcade.Text("Loading...", self.game_window.width / 2, 40, arcade.color.WHITE, 20,
+                                        anchor_x="center", font_name="Kenney Mini Square")
         self.load_scrolling_text()
 
     def load_scrolling_text(self):
         with open("scrolling_text.txt", "r") as file:
             self.scroll_text = file.read()
+        self.layout_scrolling_text()
 
-    def draw(self):
-        # Draw the background
-        arcade.draw_lrwh_rectangle_textured(0, 0, self.game_window.width, self.game_window.height, self.game_window.background)
-
-        # Split the text into lines and draw
+    def layout_scrolling_text(self):
+        # Split the text into lines and lay them out once, relative to the scroll position
+        self.text_block.clear()
         lines = self.scroll_text.split('\n')
         line_height = 20  # Adjust as needed for spacing between lines
-        start_y = self.scroll_text_y + 200
+        y_offset = 200
 
         for line in lines:
             if "TERAFOR" in line:
-                # Draw the main title with a larger font
-                arcade.draw_text(line, self.game_window.width / 2, start_y, arcade.color.YELLOW, 150, anchor_x="center",
-                                 font_name="Kenney Blocks")
+                # The main title has a larger font
+                self.text_block.add_line(line, self.game_window.width / 2, y_offset, arcade.color.YELLOW, 150,
+                                         anchor_x="center", font_name="Kenney Blocks")
             else:
-                # Draw other lines with the regular font and size
-                arcade.draw_text(line, self.game_window.width / 2, start_y, arcade.color.YELLOW, 30, anchor_x="center",
-                                 font_name="Kenney Mini Square")
-            start_y -= line_height  # Move down for the next line
+                # Other lines have the regular font and size
+                self.text_block.add_line(line, self.game_window.width / 2, y_offset, arcade.color.YELLOW, 30,
+                                         anchor_x="center", font_name="Kenney Mini Square")
+            y_offset -= line_height  # Move down for the next line
+
+    def draw(self):
+        # Draw the background
+        arcade.draw_lrwh_rectangle_textured(0, 0, self.game_window.width, self.game_window.height, self.game_window.background)
+
+        # Draw the scrolling text
+        self.text_block.draw(self.scroll_text_y, self.game_window.height)
+
+        if self.game_window.start_requested:
+            self.loading_text.draw()
 
         # Draw the exit button
-        arcade.draw_text("Exit", 10, 10, arcade.color.WHITE, 14, font_name="Kenney Blocks")
+        self.exit_text.draw()
 
     def update(self, delta_time):
         # Scroll the text upwards
@@ -0,0 +1,251 @@
+# world.py
+import copy
+import math
+import random
+from arcade import key
+from constants import (SCREEN_WIDTH, SCREEN_HEIGHT, ORBIT_RADIUS, ORBIT_SPEED, SIM_TICK,
+                       PARTICLE_EMISSION_MIN_TIME, PARTICLE_EMISSION_MAX_TIME)
+from particles import LightGreyParticle, PositiveParticle, NegativeParticle, MOVING, STATIONARY
+from particle_store import ParticleStore
+from spatial_hash import SpatialHash, TypeLattice, CELL_SIZE
+from layered import LayeredDict, LayeredSet
+from sun import Sun, EMISSION_SOUNDS
+from collision_handling import detect_collision
+from square_building import find_3x3_squares
+from profiler import FrameProfiler
+
+# Keys that steer moving particles, and the direction each key sends them in
+STEERING_KEYS = [key.W, key.A, key.S, key.D, key.UP, key.DOWN, key.LEFT, key.RIGHT]
+MOVE_UP_ANGLE = 90
+MOVE_DOWN_ANGLE = 270
+MOVE_RIGHT_ANGLE = 0
+MOVE_LEFT_ANGLE = 180
+# The particle types the keys steer, and the angle each key sends them at
+STEERING_ANGLES = {
+    PositiveParticle: {key.W: MOVE_DOWN_ANGLE, key.S: MOVE_UP_ANGLE, key.A: MOVE_RIGHT_ANGLE, key.D: MOVE_LEFT_ANGLE},
+    NegativeParticle: {key.W: MOVE_UP_ANGLE, key.S: MOVE_DOWN_ANGLE, key.A: MOVE_LEFT_ANGLE, key.D: MOVE_RIGHT_ANGLE},
+    LightGreyParticle: {key.UP: MOVE_UP_ANGLE, key.DOWN: MOVE_DOWN_ANGLE, key.LEFT: MOVE_LEFT_ANGLE,
+                        key.RIGHT: MOVE_RIGHT_ANGLE},
+}
+
+
+def planet_ring(particle):
+    # How far from the middle of the screen the particle's farthest corner is, in CELL_SIZE rings
+    reach = math.hypot(abs(particle.center_x - SCREEN_WIDTH / 2) + particle.width / 2,
+                       abs(particle.center_y - SCREEN_HEIGHT / 2) + particle.height / 2)
+    return int(reach // CELL_SIZE)
+
+
+# The whole game simulation: particles, the sun's orbit and the emission timer. It never
+# touches a window, textures or audio, so it can also be stepped headless. Sounds are
+# queued as names in sound_events for whoever is presenting the game to play.
+# All randomness comes from self.rng, so two worlds with the same seed that get the same
+# key presses on the same ticks end up in exactly the same state.
+class World:
+    # The emission times and orbit speed default to the game's constants and can be changed to
+    # try out other tunings, as batch_runner does
+    def __init__(self, seed=None, emission_min_time=PARTICLE_EMISSION_MIN_TIME,
+                 emission_max_time=PARTICLE_EMISSION_MAX_TIME, orbit_speed=ORBIT_SPEED):
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.emission_min_time = emission_min_time
+        self.emission_max_time = emission_max_time
+        self.sun = Sun("assets/images/SunSprite.png", scale=1.05,
+                       orbit_radius=ORBIT_RADIUS, orbit_speed=orbit_speed)
+        self.particles = ParticleStore()
+        # Two sets to track moving and stationary particles. The planet's is a LayeredSet so
+        # forks share it.
+        self.moving_particles = set()
+        self.stationary_particles = LayeredSet()
+        # moving_particles of each type in STEERING_ANGLES, so a key only visits the particles it steers
+        self.steerable_particles = {particle_type: set() for particle_type in STEERING_ANGLES}
+        # Bumped whenever stationary_particles changes, so the renderer knows to redraw the planet
+        self.stationary_version = 0
+        # Sum of the gravitational values of stationary_particles, kept up to date as they change
+        self.score = 0
+        # Number of 3x3 squares that have collapsed
+        self.collapses = 0
+        # Lattice hash of stationary_particles so collision checks only look at nearby cells
+        self.stationary_grid = SpatialHash()
+        # The same particles keyed by (type, cell), used by square_building to find 3x3 squares
+        self.type_lattice = TypeLattice()
+        # stationary_particles in rings CELL_SIZE wide around the middle of the screen, by how far
+        # their farthest corner reaches, so the sun check only looks at the planet's outer edge
+        self.planet_rings = LayeredDict()
+        # The farthest ring out that has a particle in it, -1 with no planet
+        self.outer_ring = -1
+        # Cells that gained a stationary particle since square_building last looked for squares
+        self.square_check_cells = []
+        self.particle_timer = 0
+        self.next_particle_time = self.rng.uniform(self.emission_min_time, self.emission_max_time)
+        # Particles to add to and remove from self.particles at the end of the tick, so the
+        # handlers never change the store while detect_collision is going through it
+        self.spawned_particles = []
+        self.despawned_particles = []
+        self.sound_events = []
+        self.is_game_over = False
+        # Disabled until switched on, timed phases then cost next to nothing
+        self.profiler = FrameProfiler()
+
+    def setup(self):
+        # The planet starts as a single light grey particle in the middle of the screen
+        first_particle = LightGreyParticle()
+        first_particle.center_x = SCREEN_WIDTH / 2
+        first_particle.center_y = SCREEN_HEIGHT / 2
+        first_particle.speed = 0
+        self.particles.append(first_particle)
+        self.add_stationary_particle(first_particle)
+
+    def fork(self):
+        # An independent copy of the world to step with other inputs, like a bot trying out
+        # moves. The planet is shared with this world through layered containers, which each
+        # side only adds its own changes to, so a fork costs about a copy of the moving
+        # particles whatever the size of the planet. A fork that is never stepped works as a
+        # snapshot to fork again later. Only fork between ticks.
+        world = object.__new__(World)
+        world.__dict__.update(self.__dict__)
+        world.rng = random.Random()
+        world.rng.setstate(self.rng.getstate())
+        world.sun = copy.copy(self.sun)
+        world.particles, copies = self.particles.fork(self.stationary_particles.fork())
+        world.moving_particles = {copies[particle] for particle in self.moving_particles}
+        world.steerable_particles = {particle_type: {copies[particle] for particle in particles}
+                                     for particle_type, particles in self.steerable_particles.items()}
+        world.stationary_particles = self.stationary_particles.fork()
+        world.stationary_grid = self.stationary_grid.fork()
+        world.type_lattice = self.type_lattice.fork()
+        world.planet_rings = self.planet_rings.fork()
+        world.square_check_cells = list(self.square_check_cells)
+        world.spawned_particles = []
+        world.despawned_particles = []
+        world.sound_events = []
+        world.profiler = FrameProfiler()
+        return world
+
+    def add_moving_particle(self, particle):
+        self.moving_particles.add(particle)
+        steerable_particles = self.steerable_particles.get(type(particle))
+        if steerable_particles is not None:
+            steerable_particles.add(particle)
+        particle.state = MOVING
+
+    def discard_moving_particle(self, particle):
+        self.moving_particles.discard(particle)
+        steerable_particles = self.steerable_particles.get(type(particle))
+        if steerable_particles is not None:
+            steerable_particles.discard(particle)
+
+    def add_stationary_particle(self, particle):
+        if particle not in self.stationary_particles:
+            self.score += particle.gravitational_value
+            ring = planet_ring(particle)
+            self.planet_rings.value_to_change(ring, set).add(particle)
+            self.outer_ring = max(self.outer_ring, ring)
+        self.stationary_particles.add(particle)
+        self.stationary_version += 1
+        particle.state = STATIONARY
+        cell = self.stationary_grid.add(particle)
+        self.type_lattice.add(particle, cell)
+        self.square_check_cells.append((type(particle), cell))
+
+    def discard_stationary_particle(self, particle):
+        if particle in self.stationary_particles:
+            self.score -= particle.gravitational_value
+            ring = planet_ring(particle)
+            particles = self.planet_rings.value_to_change(ring, set)
+            particles.discard(particle)
+            if not particles:
+                del self.planet_rings[ring]
+                while self.outer_ring >= 0 and self.outer_ring not in self.planet_rings:
+                    self.outer_ring -= 1
+        self.stationary_particles.discard(particle)
+        self.stationary_version += 1
+        cell = self.stationary_grid.remove(particle)
+        if cell is not None:
+            self.type_lattice.remove(particle, cell)
+
+    def spawn_particle(self, particle):
+        self.spawned_particles.append(particle)
+
+    def despawn_particle(self, particle):
+        self.despawned_particles.append(particle)
+
+    def apply_spawns(self):
+        # Despawning the same particle twice is fine, and a particle spawned and despawned in
+        # the same tick never reaches the store
+        despawned_particles = set(self.despawned_particles)
+        for particle in self.despawned_particles:
+            if particle in self.particles:
+                self.particles.remove(particle)
+        for particle in self.spawned_particles:
+            if particle not in despawned_particles:
+                self.particles.append(particle)
+        self.spawned_particles = []
+        self.despawned_particles = []
+
+    def play_sound(self, name):
+        self.sound_events.append(name)
+
+    def pop_sound_events(self):
+        sound_events = self.sound_events
+        self.sound_events = []
+        return sound_events
+
+    def step(self, delta_time=SIM_TICK):
+        profiler = self.profiler
+        self.tick += 1
+        with profiler.phase("emission"):
+            self.sun.update(delta_time)
+
+            self.particle_timer += delta_time
+            if self.particle_timer >= self.next_particle_time:
+                self.particle_timer = 0
+                self.next_particle_time = self.rng.uniform(self.emission_min_time, self.emission_max_time)
+                new_particle = self.sun.emit_particle(self.rng)
+                self.play_sound(EMISSION_SOUNDS[type(new_particle)])
+                self.add_moving_particle(new_particle)
+                self.particles.append(new_particle)
+
+        with profiler.phase("collision"):
+            detect_collision(self)
+        with profiler.phase("squares"):
+            find_3x3_squares(self)
+        with profiler.phase("sun_check"):
+            if self.planet_touches_sun():
+                self.is_game_over = True
+        self.apply_spawns()
+
+    def planet_touches_sun(self):
+        # Only particles that reach at least as far out as the sun's nearest edge can touch it.
+        # Usually the whole planet is well inside that, which one comparison shows.
+        sun = self.sun
+        sun_distance = math.hypot(sun.center_x - SCREEN_WIDTH / 2, sun.center_y - SCREEN_HEIGHT / 2)
+        nearest_ring = int((sun_distance - sun.radius) // CELL_SIZE)
+        if self.outer_ring < nearest_ring:
+            return False
+        for ring in range(max(nearest_ring, 0), self.outer_ring + 1):
+            for particle in self.planet_rings.get(ring, ()):
+                if sun.collides_with(particle):
+                    return True
+        return False
+
+    def press_key(self, pressed_key):
+        # Change the direction of the moving particles the key steers
+        for particle_type, angles in STEERING_ANGLES.items():
+            angle = angles.get(pressed_key)
+            if angle is not None:
+                for particle in self.steerable_particles[particle_type]:
+                    particle.angle = angle
+
+        if pressed_key == key.RETURN:
+            self.sun.reverse_orbit_direction()
+
+    def release_key(self, released_key):
+        # Set angles of moving particles towards the center on key release
+        if released_key in STEERING_KEYS:
+            center_x = SCREEN_WIDTH / 2
+            center_y = SCREEN_HEIGHT / 2
+            for steerable_particles in self.steerable_particles.values():
+                for particle in steerable_particles:
+                    particle.angle = particle.angle_towards_center(center_x, center_y)
@@ -0,0 +1,90 @@
+# world_renderer.py
+import arcade
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from particles import STATIONARY
+from sprite_pool import SpritePool, get_texture
+
+
+# Draws the sun and the particles of a World. It only needs an active arcade window, so it
+# can also be used from a headless window by the benchmarks.
+# A frame is two layers. The background and the planet's stationary particles are rendered
+# into an offscreen framebuffer, which is only redrawn when the stationary particles change
+# and is otherwise copied to the screen as it is. The sun and everything that moves go in a
+# second SpriteList drawn on top, so a frame takes the same few draw calls however large
+# the planet grows.
+class WorldRenderer:
+    def __init__(self, world, background=None):
+        self.world = world
+        self.background = background
+        self.sun_sprite = arcade.Sprite(texture=get_texture(world.sun.image_file), scale=world.sun.scale)
+        self.sprite_pool = SpritePool()
+        # Stationary particles and their sprites, drawn into the planet layer
+        self.planet_sprites = {}
+        self.planet_sprite_list = arcade.SpriteList()
+        self.planet_version = None
+        self.planet_layer = None
+        # The sun and the moving and free particles
+        self.dynamic_sprites = {}
+        self.dynamic_sprite_list = arcade.SpriteList()
+        self.dynamic_sprite_list.append(self.sun_sprite)
+
+    def update_planet_sprites(self):
+        # Only called when the stationary particles changed, so a full pass is fine here
+        stationary_particles = self.world.stationary_particles
+        for particle in [particle for particle in self.planet_sprites if particle not in stationary_particles]:
+            sprite = self.planet_sprites.pop(particle)
+            self.planet_sprite_list.remove(sprite)
+            self.sprite_pool.release(particle, sprite)
+        for particle in stationary_particles:
+            if particle not in self.planet_sprites:
+                sprite = self.sprite_pool.acquire(particle)
+                self.planet_sprites[particle] = sprite
+                self.planet_sprite_list.append(sprite)
+
+    def update_dynamic_sprites(self):
+        # Keep one sprite per particle that isn't part of the planet, handing sprites of
+        # removed particles back to the pool
+        old_sprites = self.dynamic_sprites
+        dynamic_sprites = {}
+        for particle in self.world.particles.without_state(STATIONARY):
+            sprite = old_sprites.pop(particle, None)
+            if sprite is None:
+                sprite = self.sprite_pool.acquire(particle)
+                self.dynamic_sprite_list.append(sprite)
+            else:
+                sprite.center_x = particle.center_x
+                sprite.center_y = particle.center_y
+                sprite.angle = particle.angle
+            dynamic_sprites[particle] = sprite
+        for particle, sprite in old_sprites.items():
+            self.dynamic_sprite_list.remove(sprite)
+            self.sprite_pool.release(particle, sprite)
+        self.dynamic_sprites = dynamic_sprites
+
+    def render_planet_layer(self):
+        window = arcade.get_window()
+        size = window.get_framebuffer_size()
+        if self.planet_layer is None or self.planet_layer.size != size:
+            self.planet_layer = window.ctx.framebuffer(color_attachments=[window.ctx.texture(size, components=4)])
+        with self.planet_layer.activate():
+            self.planet_layer.clear()
+            if self.background is not None:
+                arcade.draw_lrwh_rectangle_textured(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, self.background)
+            self.planet_sprite_list.draw()
+
+    def draw(self):
+        sun = self.world.sun
+        self.sun_sprite.center_x = sun.center_x
+        self.sun_sprite.center_y = sun.center_y
+        self.sun_sprite.angle = sun.angle
+        with self.world.profiler.phase("sprites"):
+            if self.planet_version != self.world.stationary_version:
+                self.update_planet_sprites()
+                self.render_planet_layer()
+                self.planet_version = self.world.stationary_version
+            self.update_dynamic_sprites()
+        window = arcade.get_window()
+        if self.planet_layer.size != window.get_framebuffer_size():
+            self.render_planet_layer()
+        window.ctx.copy_framebuffer(self.planet_layer, window.ctx.screen)
+        self.dynamic_sprite_list.draw()